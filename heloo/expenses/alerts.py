@@ -0,0 +1,83 @@
+"""
+Budget threshold alerts raised from the Expense write path.
+
+After a write has been folded into the spend counters, ``check`` looks at
+the budgets on the categories whose current-window spend went up. One query
+fetches their limits, their counters and the highest threshold already
+recorded this period. A BudgetAlert row is stored the first time a budget
+reaches each of THRESHOLDS percent in a window. The unique key on (budget,
+window, threshold) deduplicates alerts, even between concurrent writers.
+Clients follow new alerts through the ``since=`` feed instead of polling
+budget status.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, DateField, F, FilteredRelation, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from . import counters
+from .budgets import convert_spend
+from .fx import REFERENCE_CURRENCY, RateTable
+from .models import Budget, BudgetAlert
+
+THRESHOLDS = (80, 100)
+
+
+def raised_spend(deltas, now=None):
+    """``{user_id: {category_id}}`` whose current-window spend grew in counter ``deltas``."""
+    today = timezone.localdate(now)
+    current = {period: counters.window_start(period, today) for period in counters.PERIODS}
+    raised = defaultdict(set)
+    for (user_id, start, category_id, _, period), (amount, _) in deltas.items():
+        if amount > 0 and start == current[period]:
+            raised[user_id].add(category_id)
+    return raised
+
+
+def check(raised, now=None):
+    """Record thresholds newly reached by the budgets on ``{user_id: {category_id}}``."""
+    today = timezone.localdate(now)
+    windows = {period: counters.window_start(period, today) for period in counters.PERIODS}
+    window = Case(
+        *(When(period=period, then=Value(start)) for period, start in windows.items()),
+        output_field=DateField(),
+    )
+    rates = RateTable(REFERENCE_CURRENCY, today, today)
+
+    alerts = []
+    for user_id, category_ids in raised.items():
+        rows = (
+            Budget.objects.filter(user_id=user_id, category_id__in=category_ids)
+            .annotate(window=window)
+            .annotate(spend=FilteredRelation('category__period_spend', condition=Q(
+                category__period_spend__user=F('user'),
+                category__period_spend__period=F('period'),
+                category__period_spend__start=F('window'),
+            )))
+            .annotate(alerted=Subquery(
+                BudgetAlert.objects.filter(budget=OuterRef('pk'), period_start=OuterRef('window'))
+                .order_by('-threshold').values('threshold')[:1]
+            ))
+            .values_list('id', 'limit', 'currency', 'window', 'alerted', 'spend__currency', 'spend__total')
+        )
+        budgets = {}
+        for budget_id, limit, currency, start, alerted, spend_currency, total in rows:
+            budget = budgets.setdefault(budget_id, (limit, currency, start, alerted or 0, {}))
+            if spend_currency is not None:
+                budget[4][spend_currency] = total
+
+        for budget_id, (limit, currency, start, alerted, by_currency) in budgets.items():
+            if limit <= 0:
+                continue
+            reached = [threshold for threshold in THRESHOLDS if threshold > alerted]
+            if not reached:
+                continue
+            spent = convert_spend(by_currency, currency, rates, today)
+            alerts += [
+                BudgetAlert(user_id=user_id, budget_id=budget_id, period_start=start, threshold=threshold,
+                            spent=spent, limit=limit, currency=currency)
+                for threshold in reached if spent >= limit * threshold / 100
+            ]
+    if alerts:
+        BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return alerts
@@ -0,0 +1,251 @@
+"""
+Spending analytics computed from the DailySpend rollup.
+
+``summarize`` makes one pass over the rollup rows of the requested range;
+each row is already a (day, category, currency) total, so converting into
+the user's currency costs one memoized factor per currency and day.
+``asummarize`` serves async views: it splits the work into independent
+queries and runs them concurrently, so its latency is that of the slowest
+one rather than the sum. ``timeseries`` buckets spending by day, week,
+month, quarter or year in any time zone, truncating and grouping in the
+database.
+"""
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+
+from .fx import REFERENCE_CURRENCY, RateTable, user_currency
+from .models import Category, DailySpend, Expense
+
+SECTIONS = ('total', 'count', 'average', 'category_breakdown', 'daily_trend', 'weekly_breakdown')
+# Sections answered by per-day totals; category_breakdown needs per-category rows.
+DAILY_SECTIONS = {'total', 'count', 'average', 'daily_trend', 'weekly_breakdown'}
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+# Zero-filling is linear in the number of buckets, so cap it.
+MAX_BUCKETS = 5000
+
+
+def parse_include(value):
+    """Sections named in a comma-separated ``include`` param; all of them when empty."""
+    if not value:
+        return set(SECTIONS)
+    include = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = include - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(sorted(unknown))}.")
+    return include
+
+
+def _rollup(user, start, end):
+    rollup = DailySpend.objects.filter(user=user)
+    if start is not None:
+        rollup = rollup.filter(day__gte=start)
+    if end is not None:
+        rollup = rollup.filter(day__lte=end)
+    return rollup
+
+
+def summarize(user, start=None, end=None, include=SECTIONS):
+    rollup = _rollup(user, start, end)
+    currency = user_currency(user)
+    rates = RateTable(currency, start, end)
+
+    total = 0
+    count = 0
+    categories = {}
+    daily = {}
+    for day, category_id, row_currency, amount, row_count in rollup.values_list(
+        'day', 'category_id', 'currency', 'total', 'count'
+    ):
+        amount *= rates.factor(row_currency, day)
+        total += amount
+        count += row_count
+        entry = categories.setdefault(category_id, {'category': None, 'total': 0, 'count': 0})
+        entry['total'] += amount
+        entry['count'] += row_count
+        daily[day] = daily.get(day, 0) + amount
+
+    # Rows are grouped on the integer key; names are looked up once at the end.
+    if categories and 'category_breakdown' in include:
+        for category_id, name in Category.objects.filter(id__in=categories).values_list('id', 'name'):
+            categories[category_id]['category'] = name
+
+    return _result(currency, rates, include, total, count, categories, daily)
+
+
+def _in_thread(func):
+    """Run ``func`` on a worker thread, which opens (and here closes) its own DB connection."""
+    def run():
+        try:
+            return func()
+        finally:
+            connections.close_all()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def asummarize(user, start=None, end=None, include=SECTIONS):
+    """
+    Same payload as ``summarize``, with the user's currency, the rates, the
+    per-day totals and the per-category rows fetched concurrently. Sections
+    left out of ``include`` are not queried at all.
+    """
+    rollup = _rollup(user, start, end)
+    # Rates are stored against the reference currency, so they can load before
+    # the user's currency is known.
+    rates = RateTable(REFERENCE_CURRENCY, start, end)
+    tasks = {
+        'currency': lambda: user_currency(user),
+        'rates': rates.load,
+    }
+    if DAILY_SECTIONS & set(include):
+        tasks['daily'] = lambda: list(
+            rollup.values('day', 'currency')
+            .annotate(day_total=Sum('total'), day_count=Sum('count'))
+            .values_list('day', 'currency', 'day_total', 'day_count')
+            .order_by()
+        )
+    if 'category_breakdown' in include:
+        tasks['categories'] = lambda: list(rollup.values_list('category_id', 'day', 'currency', 'total', 'count'))
+        tasks['names'] = lambda: dict(Category.objects.filter(user=user).values_list('id', 'name'))
+    results = dict(zip(tasks, await asyncio.gather(*(_in_thread(task) for task in tasks.values()))))
+
+    currency = rates.target = results['currency']
+    total = 0
+    count = 0
+    daily = {}
+    for day, row_currency, amount, row_count in results.get('daily', ()):
+        amount *= rates.factor(row_currency, day)
+        total += amount
+        count += row_count
+        daily[day] = daily.get(day, 0) + amount
+
+    categories = {}
+    names = results.get('names', {})
+    for category_id, day, row_currency, amount, row_count in results.get('categories', ()):
+        entry = categories.setdefault(category_id, {'category': names.get(category_id), 'total': 0, 'count': 0})
+        entry['total'] += amount * rates.factor(row_currency, day)
+        entry['count'] += row_count
+
+    return _result(currency, rates, include, total, count, categories, daily)
+
+
+def _result(currency, rates, include, total, count, categories, daily):
+    data = {'currency': currency}
+    if 'total' in include:
+        data['total'] = total
+    if 'count' in include:
+        data['count'] = count
+    if 'average' in include:
+        data['average'] = round(total / count, 2) if count > 0 else 0
+    if 'category_breakdown' in include:
+        data['category_breakdown'] = sorted(categories.values(), key=lambda c: c['total'], reverse=True)
+
+    daily_trend = [{'date': day, 'total': daily[day]} for day in sorted(daily)]
+    if 'daily_trend' in include:
+        data['daily_trend'] = daily_trend
+    if 'weekly_breakdown' in include:
+        weekly = {}
+        for row in daily_trend:
+            # Keyed by ISO year and week, so week 3 of two years stay apart.
+            year, week, _ = row['date'].isocalendar()
+            key = f"{year}-W{week:02d}"
+            weekly[key] = weekly.get(key, 0) + row['total']
+        data['weekly_breakdown'] = weekly
+    data['missing_rates'] = sorted(rates.missing)
+    return data
+
+
+def bucket_start(day, granularity):
+    """First day of the ``granularity`` bucket containing ``day``; weeks start on Monday."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return date(day.year, day.month - (day.month - 1) % 3, 1)
+    return date(day.year, 1, 1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    months = {'month': 1, 'quarter': 3, 'year': 12}[granularity]
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def _bucketed_rows(user, granularity, tz, start, end):
+    """``(bucket, day, currency, total, count)`` rows from one grouped query."""
+    if tz is None or tz.key == timezone.get_default_timezone_name():
+        # The rollup is already keyed by day in the default time zone.
+        rows = _rollup(user, start, end).annotate(
+            bucket=Trunc('day', granularity, output_field=DateField()),
+            local_day=F('day'),
+        ).values('bucket', 'local_day', 'currency').annotate(amount=Sum('total'), n=Sum('count'))
+    else:
+        expenses = Expense.objects.filter(user=user)
+        if start is not None:
+            expenses = expenses.filter(date__gte=datetime.combine(start, time.min, tzinfo=tz))
+        if end is not None:
+            expenses = expenses.filter(date__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz))
+        rows = expenses.annotate(
+            bucket=Trunc('date', granularity, output_field=DateField(), tzinfo=tz),
+            local_day=TruncDate('date', tzinfo=tz),
+        ).values('bucket', 'local_day', 'currency').annotate(amount=Sum('amount'), n=Count('id'))
+    # Rows stay split by day and currency only so each is converted at that day's rate.
+    return rows.order_by().values_list('bucket', 'local_day', 'currency', 'amount', 'n')
+
+
+def timeseries(user, granularity='day', tz=None, start=None, end=None):
+    """
+    Spending per ``granularity`` bucket in the user's currency, with days
+    taken in ``tz`` (a ZoneInfo; default time zone when None). Buckets
+    between ``start`` and ``end``, or between the first and last bucket
+    with spending, are zero-filled. Raises ValueError for spans of more
+    than MAX_BUCKETS buckets.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Must be one of: {', '.join(GRANULARITIES)}.")
+    currency = user_currency(user)
+    rates = RateTable(currency, start, end)
+    totals = {}
+    for bucket, day, row_currency, amount, count in _bucketed_rows(user, granularity, tz, start, end):
+        entry = totals.setdefault(bucket, [0, 0])
+        entry[0] += amount * rates.factor(row_currency, day)
+        entry[1] += count
+
+    buckets = []
+    if totals or (start is not None and end is not None):
+        first = bucket_start(start, granularity) if start is not None else min(totals)
+        last = bucket_start(end, granularity) if end is not None else max(totals)
+        if _bucket_count(first, last, granularity) > MAX_BUCKETS:
+            raise ValueError(f"The range spans more than {MAX_BUCKETS} buckets; use a coarser granularity.")
+        current = first
+        while current <= last:
+            following = next_bucket(current, granularity)
+            total, count = totals.get(current, (0, 0))
+            buckets.append({'start': current, 'end': following - timedelta(days=1), 'total': total, 'count': count})
+            current = following
+    return {
+        'currency': currency,
+        'granularity': granularity,
+        'tz': tz.key if tz is not None else timezone.get_default_timezone_name(),
+        'buckets': buckets,
+        'missing_rates': sorted(rates.missing),
+    }
+
+
+def _bucket_count(first, last, granularity):
+    if granularity in ('day', 'week'):
+        return (last - first).days // (1 if granularity == 'day' else 7) + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // {'month': 1, 'quarter': 3, 'year': 12}[granularity] + 1
@@ -0,0 +1,160 @@
+"""
+Incremental detection of unusually large expenses.
+
+Each (user, category, currency) has an AnomalyBaseline: the count, mean
+and sum of squared deviations of the amounts scanned so far. A run only
+reads expenses above the user's AnomalyScan high-water mark, in id order
+and in chunks of ``batch_size``. Every chunk is scored in vectorized
+form. Per-group prefix sums give each expense the statistics of everything
+before it. An expense is flagged when it is at least Z_THRESHOLD spreads
+above that mean. The baselines are then folded forward, and the new
+anomalies, baselines and mark are written in one transaction. A run
+therefore costs time in proportion to the new rows, and a failed run
+resumes where it stopped. Users are independent, so ``scan_users``
+chunks can run in parallel (see the detect_anomalies command).
+
+Baselines follow expenses as they were first scanned; later edits and
+deletes do not change them. NumPy is required (``available()``).
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import signals
+from .models import AnomalyBaseline, AnomalyScan, Expense, ExpenseAnomaly
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Flag amounts this many spreads above the category's mean ...
+Z_THRESHOLD = 3.0
+# ... once it has this many earlier expenses.
+MIN_HISTORY = 5
+# The spread never counts as less than this share of the mean, so a category
+# of identical amounts does not flag every small change.
+MIN_SPREAD_RATIO = 0.1
+# Baselines weigh about this many recent expenses: beyond it, count and m2
+# are scaled down after each chunk, so old spending fades out.
+WINDOW = 200
+
+BATCH_SIZE = 5000
+
+
+def available():
+    return np is not None
+
+
+def pending_users():
+    """Ids of users with expenses above their high-water mark."""
+    return list(
+        User.objects.annotate(mark=Coalesce('anomalyscan__last_expense_id', 0))
+        .filter(Exists(Expense.objects.filter(user=OuterRef('pk'), id__gt=OuterRef('mark'))))
+        .order_by('id').values_list('id', flat=True)
+    )
+
+
+def scan_users(user_ids, batch_size=BATCH_SIZE):
+    """Scan the new expenses of ``user_ids``; returns the number of anomalies flagged."""
+    flagged = 0
+    touched = set()
+    for user_id in user_ids:
+        found = scan(user_id, batch_size)
+        if found:
+            flagged += found
+            touched.add(user_id)
+    if touched:
+        signals.user_data_touched(touched)
+    return flagged
+
+
+def scan(user_id, batch_size=BATCH_SIZE):
+    flagged = 0
+    while True:
+        with transaction.atomic():
+            mark, _ = AnomalyScan.objects.select_for_update().get_or_create(user_id=user_id)
+            rows = list(
+                Expense.objects.filter(user_id=user_id, id__gt=mark.last_expense_id)
+                .order_by('id').values_list('id', 'category_id', 'currency', 'amount')[:batch_size]
+            )
+            if not rows:
+                return flagged
+            flagged += _score_chunk(user_id, rows)
+            mark.last_expense_id = rows[-1][0]
+            mark.scanned_at = timezone.now()
+            mark.save(update_fields=['last_expense_id', 'scanned_at'])
+        if len(rows) < batch_size:
+            return flagged
+
+
+def _score_chunk(user_id, rows):
+    ids, category_ids, currencies, amounts = zip(*rows)
+    ids = np.asarray(ids)
+    amounts = np.asarray(amounts, dtype=float)
+    # One group per (category, currency); currencies are coded by their rank in this chunk
+    _, currency_codes = np.unique(np.asarray(currencies), return_inverse=True)
+    _, first, group_of = np.unique(
+        np.asarray(category_ids) * 8 + currency_codes, return_index=True, return_inverse=True,
+    )
+    group_keys = [(category_ids[row], currencies[row]) for row in first.tolist()]
+
+    baselines = {
+        (b.category_id, b.currency): b
+        for b in AnomalyBaseline.objects.filter(user_id=user_id, category_id__in=set(category_ids))
+    }
+    empty = AnomalyBaseline()
+    base = [baselines.get(key, empty) for key in group_keys]
+    count0 = np.array([b.count for b in base], dtype=float)
+    mean0 = np.array([b.mean for b in base], dtype=float)
+    m2_0 = np.array([b.m2 for b in base], dtype=float)
+
+    # Rows come in id order, so a stable sort groups them and keeps that order.
+    # Deviations from the stored mean keep the sums small.
+    order = np.argsort(group_of, kind='stable')
+    group, x = group_of[order], amounts[order]
+    deviation = x - mean0[group]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    sizes = np.diff(np.r_[starts, len(group)])
+    position = np.arange(len(group)) - np.repeat(starts, sizes)
+
+    def before(values):
+        """Sum of ``values`` over the earlier rows of the same group."""
+        running = np.cumsum(values) - values
+        return running - np.repeat(running[starts], sizes)
+
+    sum_dev, sum_sq = before(deviation), before(deviation ** 2)
+    n = count0[group] + position
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = mean0[group] + np.where(n > 0, sum_dev / n, 0)
+        m2 = m2_0[group] + sum_sq - np.where(n > 0, sum_dev ** 2 / n, 0)
+        spread = np.maximum(np.sqrt(np.maximum(m2, 0) / np.maximum(n - 1, 1)), MIN_SPREAD_RATIO * np.abs(mean))
+        score = np.where(spread > 0, (x - mean) / spread, 0)
+    hits = np.flatnonzero((n >= MIN_HISTORY) & (score >= Z_THRESHOLD))
+
+    anomalies = [
+        ExpenseAnomaly(user_id=user_id, expense_id=int(ids[order[i]]), typical=float(mean[i]),
+                       spread=float(spread[i]), score=float(score[i]))
+        for i in hits.tolist()
+    ]
+    if anomalies:
+        ExpenseAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+
+    # Fold the chunk into the baselines
+    total_dev = np.add.reduceat(deviation, starts)
+    total_sq = np.add.reduceat(deviation ** 2, starts)
+    count = count0 + sizes
+    mean = mean0 + total_dev / count
+    m2 = np.maximum(m2_0 + total_sq - total_dev ** 2 / count, 0)
+    fade = np.minimum(1, WINDOW / count)
+    AnomalyBaseline.objects.bulk_create(
+        [
+            AnomalyBaseline(user_id=user_id, category_id=category_id, currency=currency,
+                            count=float(c), mean=float(m), m2=float(s))
+            for (category_id, currency), c, m, s in zip(group_keys, count * fade, mean, m2 * fade)
+        ],
+        update_conflicts=True, unique_fields=['user', 'category', 'currency'], update_fields=['count', 'mean', 'm2'],
+    )
+    return len(anomalies)
@@ -0,0 +1,45 @@
+"""
+Per-user batch jobs split across a process pool.
+
+The nightly commands (materialize_recurring, precompute_forecasts,
+detect_anomalies) work on users independently. ``run`` splits the user ids
+into chunks and calls ``func(chunk, *args)`` for each one, in a process pool
+when ``workers > 1``. SQLite only allows one writer at a time, so there the
+chunks always run in this process.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+
+
+def user_ids(usernames):
+    """Sorted ids of ``usernames``; raises ValueError naming any that do not exist."""
+    users = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    missing = set(usernames) - set(users)
+    if missing:
+        raise ValueError(f"Unknown user(s): {', '.join(sorted(missing))}")
+    return sorted(users.values())
+
+
+def _worker_init():
+    # No-op under fork; under spawn the worker starts with a bare interpreter.
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def run(func, user_ids, *args, chunk_size=50, workers=1):
+    """
+    Call ``func(chunk, *args)`` on chunks of ``chunk_size`` users. Returns
+    the sum of the results and the number of workers used.
+    """
+    size = max(1, chunk_size)
+    chunks = [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+    workers = max(1, min(workers, len(chunks)))
+    if workers == 1 or connection.vendor == 'sqlite':
+        return sum(func(chunk, *args) for chunk in chunks), 1
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as pool:
+        return sum(pool.map(func, chunks, *([arg] * len(chunks) for arg in args))), workers
@@ -0,0 +1,52 @@
+"""
+Spend-versus-limit status of budgets for their current period.
+"""
+from django.utils import timezone
+
+from . import counters
+from .fx import REFERENCE_CURRENCY, RateTable
+from .models import Budget
+
+
+def convert_spend(by_currency, currency, rates, day):
+    """
+    Total of a ``{currency: amount}`` mapping in ``currency`` at ``day``'s rates.
+    ``rates`` targets the reference currency, so one table serves budgets in
+    any currency.
+    """
+    return sum(amount * rates.factor(code, day) for code, amount in by_currency.items()) / rates.factor(currency, day)
+
+
+def budget_status_for(user, now=None):
+    """
+    Spend against every budget of ``user`` for its current period, read from
+    the PeriodSpend counters of the current month and year in one indexed
+    lookup (see expenses.counters).
+    """
+    budgets = list(Budget.objects.filter(user=user).select_related('category'))
+    if not budgets:
+        return []
+
+    # {(category_id, period): {currency: amount}}
+    spent_by = counters.current_spend(user, now)
+
+    today = timezone.localdate(now)
+    rates = RateTable(REFERENCE_CURRENCY, today, today)
+
+    data = []
+    for budget in budgets:
+        spent = convert_spend(spent_by.get((budget.category_id, budget.period), {}), budget.currency, rates, today)
+        remaining = budget.limit - spent
+        percentage = (spent / budget.limit * 100) if budget.limit > 0 else 0
+        data.append({
+            'id': budget.id,
+            'category': budget.category.name,
+            'limit': budget.limit,
+            'period': budget.period,
+            'currency': budget.currency,
+            'spent': spent,
+            'remaining': remaining,
+            'percentage': round(percentage, 2),
+            'is_exceeded': spent > budget.limit
+        })
+    return data
@@ -0,0 +1,122 @@
+"""
+Batch create/update/delete of expenses in a single request and transaction.
+
+Operations look like::
+
+    {"op": "create", "data": {...}}
+    {"op": "update", "id": 12, "data": {...}}
+    {"op": "delete", "id": 13}
+
+The batch is all-or-nothing: if any operation is invalid nothing is written,
+the failing items carry their errors and the rest are reported as 424.
+"""
+import copy
+
+from django.db import transaction
+
+from . import categories, signals
+from .models import Expense
+from .serializers import ExpenseSerializer
+
+MAX_OPERATIONS = 1000
+OPS = ('create', 'update', 'delete')
+
+
+def apply_operations(user, operations):
+    """Validate and apply ``operations``; return ``(ok, results)``."""
+    results = [None] * len(operations)
+    writes = []   # (index, op) for create/update, validated together
+    deletes = []  # (index, id)
+    seen_ids = set()
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in OPS:
+            results[index] = _error(index, 400, {'op': [f"Must be one of: {', '.join(OPS)}."]})
+            continue
+        op = operation['op']
+        if op != 'create':
+            pk = operation.get('id')
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                results[index] = _error(index, 400, {'id': ['A valid integer is required.']})
+                continue
+            if pk in seen_ids:
+                results[index] = _error(index, 400, {'id': ['Duplicate operation for this expense.']})
+                continue
+            seen_ids.add(pk)
+        if op == 'delete':
+            deletes.append((index, operation['id']))
+        else:
+            writes.append((index, operation))
+
+    existing = {}
+    if seen_ids:
+        existing = {expense.id: expense for expense in Expense.objects.filter(user=user, id__in=seen_ids)}
+    targets = [(i, op['id']) for i, op in writes if op['op'] == 'update'] + deletes
+    for index, pk in targets:
+        if pk not in existing:
+            results[index] = _error(index, 404, {'detail': 'No Expense matches the given query.'})
+
+    writes = [(i, op) for i, op in writes if results[i] is None]
+    deletes = [(i, pk) for i, pk in deletes if results[i] is None]
+
+    validated = []
+    if writes:
+        serializer = ExpenseSerializer(data=[op.get('data') for _, op in writes], many=True)
+        if serializer.is_valid():
+            validated = serializer.validated_data
+        else:
+            errors = serializer.errors
+            # Newer DRF reports list errors as {position: errors} (LIST_SERIALIZER_ERRORS_AS_DICT)
+            if isinstance(errors, dict):
+                errors = [errors.get(position, {}) for position in range(len(writes))]
+            for (index, _), errors in zip(writes, errors):
+                if errors:
+                    results[index] = _error(index, 400, errors)
+
+    if any(result is not None for result in results):
+        return False, [
+            result or {'index': index, 'status': 424}
+            for index, result in enumerate(results)
+        ]
+
+    created, updated, previous = [], [], []
+    with transaction.atomic(), signals.muted():
+        by_key = categories.resolve(user, [data['category']['name'] for data in validated if 'category' in data])
+        for data in validated:
+            if 'category' in data:
+                data['category'] = by_key[categories.normalize(data['category']['name'])]
+        for (index, operation), data in zip(writes, validated):
+            if operation['op'] == 'create':
+                created.append((index, Expense(user=user, **data)))
+            else:
+                expense = existing[operation['id']]
+                previous.append(copy.copy(expense))
+                for field, value in data.items():
+                    setattr(expense, field, value)
+                updated.append((index, expense))
+
+        if created:
+            Expense.objects.bulk_create([expense for _, expense in created])
+        if updated:
+            fields = sorted({field for data in validated for field in data})
+            Expense.objects.bulk_update([expense for _, expense in updated], fields)
+        deleted = [existing[pk] for _, pk in deletes]
+        if deleted:
+            Expense.objects.filter(id__in=[expense.id for expense in deleted]).delete()
+
+        signals.expenses_changed(
+            added=[expense for _, expense in created + updated],
+            removed=previous + deleted,
+        )
+
+    for index, expense in created:
+        results[index] = {'index': index, 'status': 201, 'data': ExpenseSerializer(expense).data}
+    for index, expense in updated:
+        results[index] = {'index': index, 'status': 200, 'data': ExpenseSerializer(expense).data}
+    for index, pk in deletes:
+        results[index] = {'index': index, 'status': 204, 'id': pk}
+    return True, results
+
+
+def _error(index, status, errors):
+    return {'index': index, 'status': status, 'errors': errors}
@@ -0,0 +1,130 @@
+"""
+Per-user versioned response cache for read-heavy API views.
+
+Each user has a data version stored in the cache. Cached responses are keyed
+by (user, version, endpoint, query params), and any Expense or Budget write
+bumps the version, so stale entries simply stop being looked up and expire
+on their own. Works with LocMem for a single process; point
+``EXPENSES_CACHE_ALIAS`` at a shared backend (Redis, Memcached) when running
+several workers.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.response import Response
+
+KEY_PREFIX = 'expenses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'EXPENSES_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'EXPENSES_CACHE_TIMEOUT', 300)
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:version:{user_id}"
+
+
+def _fresh_version():
+    # Never reuse a version after the key was evicted: start from the clock.
+    return time.time_ns()
+
+
+def get_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_global_version():
+    """Invalidate every user's cached responses (e.g. after new exchange rates)."""
+    return bump_version('global')
+
+
+def response_key(user_id, endpoint, params, version=None, day=None):
+    if version is None:
+        version = f"{get_version('global')}.{get_version(user_id)}"
+    query = '&'.join(f"{k}={v}" for k, values in sorted(params.lists()) for v in values)
+    if day is not None:
+        query = f"{query}#{day.isoformat()}"
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    return f"{KEY_PREFIX}:response:{user_id}:{version}:{endpoint}:{digest}"
+
+
+def _count(endpoint, outcome):
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def stats(endpoints):
+    """Return ``{endpoint: {'hits': n, 'misses': n}}`` for the given endpoints."""
+    cache = get_cache()
+    keys = {
+        (endpoint, outcome): f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+        for endpoint in endpoints for outcome in ('hits', 'misses')
+    }
+    values = cache.get_many(keys.values())
+    result = {}
+    for (endpoint, outcome), key in keys.items():
+        result.setdefault(endpoint, {})[outcome] = values.get(key, 0)
+    return result
+
+
+def cached_response(endpoint, vary_on_date=False):
+    """
+    Cache successful GET responses of a DRF function view per user. Apply it
+    below ``@api_view``/``@permission_classes`` so the request is authenticated.
+    Use ``vary_on_date`` for responses that also depend on today's date, as
+    with ``conditional``, so a new day (and period) misses the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            day = timezone.localdate() if vary_on_date else None
+            key = response_key(request.user.id, endpoint, request.query_params, day=day)
+            data = cache.get(key)
+            if data is not None:
+                _count(endpoint, 'hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count(endpoint, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=get_timeout())
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
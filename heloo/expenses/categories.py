@@ -0,0 +1,36 @@
+"""
+Resolution of category names to per-user Category rows.
+
+The API and imports keep taking categories by name. Names are matched on
+their folded ``key`` (case and surrounding/inner whitespace ignored), so
+"Food", "food" and " FOOD " share one row and one integer key; the first
+spelling seen becomes the display name.
+"""
+from .models import Category
+
+normalize = Category.normalize
+
+
+def resolve(user, names):
+    """
+    Return ``{key: Category}`` for ``names``, creating the missing ones. One
+    read, plus one insert and re-read when anything is new.
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize(name), ' '.join(name.split()))
+    found = {category.key: category for category in Category.objects.filter(user=user, key__in=wanted)}
+    missing = [Category(user=user, name=wanted[key], key=key) for key in wanted if key not in found]
+    if missing:
+        # A concurrent request may create the same key; keep whichever won.
+        Category.objects.bulk_create(missing, ignore_conflicts=True)
+        found.update(
+            (category.key, category)
+            for category in Category.objects.filter(user=user, key__in=[c.key for c in missing])
+        )
+    return found
+
+
+def get(user, name):
+    """The user's Category for ``name``, created if needed."""
+    return resolve(user, [name])[normalize(name)]
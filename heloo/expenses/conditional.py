@@ -0,0 +1,92 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304) for polled endpoints.
+
+Validators come from UserDataVersion, a per-user write counter bumped in the
+same transaction as every Expense, Budget, SavingsGoal or UserSettings write
+(a user's first write creates the row once it commits).
+Checking them costs one primary-key lookup, and an unchanged resource is
+answered with 304 before the main query or serializer runs.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import UserDataVersion
+
+
+def bump(user_ids):
+    """Advance the data version of ``user_ids``."""
+    now = timezone.now()
+    missing = [
+        user_id for user_id in user_ids
+        if not UserDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now)
+    ]
+    if missing:
+        # A missing row is either a first write or a user being deleted, whose
+        # cascade already removed it. Create rows after commit, and only for
+        # users that still exist, so the cascade never gains a new child row.
+        transaction.on_commit(lambda: _create(missing, now))
+
+
+def _create(user_ids, now):
+    for user_id in User.objects.filter(id__in=user_ids).values_list('id', flat=True):
+        updated = UserDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            UserDataVersion.objects.get_or_create(user_id=user_id, defaults={'version': 1, 'updated_at': now})
+
+
+def bump_all():
+    """Advance every user's version at once (e.g. after new exchange rates)."""
+    UserDataVersion.objects.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def data_version(request):
+    """``(version, updated_at)`` of the requesting user's data, looked up once per request."""
+    if not hasattr(request, '_data_version'):
+        row = None
+        if request.user.is_authenticated:
+            row = UserDataVersion.objects.filter(user=request.user).values_list('version', 'updated_at').first()
+        request._data_version = row or (0, None)
+    return request._data_version
+
+
+def conditional(resource, vary_on_date=False):
+    """
+    Add ETag / Last-Modified validators to a DRF function view. Apply it below
+    ``@api_view``/``@permission_classes`` so the request is authenticated.
+    Use ``vary_on_date`` for responses that also depend on today's date
+    (e.g. current budget periods); those drop Last-Modified.
+    """
+    def etag(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return None
+        version, _ = data_version(request)
+        query = request.META.get('QUERY_STRING', '')
+        today = timezone.localdate() if vary_on_date else ''
+        digest = hashlib.md5(
+            f"{resource}?{query}{args}{kwargs}{today}".encode(), usedforsecurity=False
+        ).hexdigest()[:12]
+        return f"{request.user.id}-{version}-{digest}"
+
+    def last_modified(request, *args, **kwargs):
+        if vary_on_date or not request.user.is_authenticated:
+            return None
+        return data_version(request)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # Let browsers keep the body but always revalidate it.
+                response.setdefault('Cache-Control', 'private, no-cache')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+"""
+Materialized spend per budget period window.
+
+Every Expense write adds its amount to the PeriodSpend counters of the
+monthly and the yearly window containing its date, keyed by (user, window,
+category, currency). The F() increments run in the write's transaction (see
+``Expense.save`` and ``signals.expenses_changed``), so budget status reads
+the current windows' counters in one indexed lookup. Windows roll over by
+themselves: a new month or year has no counter rows yet, which reads as
+nothing spent, and its first expense creates them.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.utils import timezone
+
+from . import rollups
+from .models import Expense, PeriodSpend
+
+PERIODS = ('monthly', 'yearly')
+KEY_FIELDS = ('user_id', 'start', 'category_id', 'currency', 'period')
+
+
+def window_start(period, day):
+    """First day of the ``period`` window containing ``day``."""
+    return day.replace(month=1, day=1) if period == 'yearly' else day.replace(day=1)
+
+
+def expense_deltas(expenses, sign=1, deltas=None):
+    """Accumulate ``{key: [amount, count]}`` changes for adding or removing expenses."""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0.0, 0])
+    for expense in expenses:
+        if expense.user_id is None:
+            continue
+        day = timezone.localdate(expense.date)
+        for period in PERIODS:
+            delta = deltas[(expense.user_id, window_start(period, day), expense.category_id, expense.currency, period)]
+            delta[0] += sign * expense.amount
+            delta[1] += sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    rollups.apply_deltas(deltas, model=PeriodSpend, key_fields=KEY_FIELDS)
+
+
+def current_spend(user, now=None):
+    """``{(category_id, period): {currency: total}}`` for the windows containing ``now``."""
+    today = timezone.localdate(now)
+    spent = {}
+    windows = Q()
+    for period in PERIODS:
+        windows |= Q(period=period, start=window_start(period, today))
+    rows = PeriodSpend.objects.filter(windows, user=user)
+    for category_id, period, currency, total in rows.values_list('category_id', 'period', 'currency', 'total'):
+        spent.setdefault((category_id, period), {})[currency] = total
+    return spent
+
+
+def expected(users=None):
+    """The counters recomputed from raw expenses, as ``{key: (total, count)}``."""
+    expenses = Expense.objects.filter(user__isnull=False)
+    if users is not None:
+        expenses = expenses.filter(user__in=users)
+    counters = {}
+    for period, trunc in (('monthly', TruncMonth), ('yearly', TruncYear)):
+        grouped = (
+            expenses.annotate(start=trunc('date'))
+            .values('user_id', 'start', 'category_id', 'currency')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        for row in grouped.iterator():
+            key = (row['user_id'], timezone.localdate(row['start']), row['category_id'], row['currency'], period)
+            counters[key] = (row['total'], row['count'])
+    return counters
+
+
+def stored(users=None):
+    rows = PeriodSpend.objects.all()
+    if users is not None:
+        rows = rows.filter(user__in=users)
+    return {row[:-2]: row[-2:] for row in rows.values_list(*KEY_FIELDS, 'total', 'count').iterator()}
+
+
+def diff(users=None, tolerance=1e-6):
+    """``[(key, stored, expected)]`` for every counter that disagrees with the raw expenses."""
+    want, have = expected(users), stored(users)
+    mismatches = []
+    for key in sorted(want.keys() | have.keys(), key=repr):
+        actual, correct = have.get(key), want.get(key)
+        if (
+            actual is None or correct is None or actual[1] != correct[1]
+            or abs(actual[0] - correct[0]) > tolerance * max(1.0, abs(correct[0]))
+        ):
+            mismatches.append((key, actual, correct))
+    return mismatches
+
+
+def rebuild(users=None, batch_size=1000):
+    """Replace the counters of ``users`` (or everyone) with values recomputed from raw expenses."""
+    rows = PeriodSpend.objects.all()
+    if users is not None:
+        rows = rows.filter(user__in=users)
+    with transaction.atomic():
+        rows.delete()
+        counters = expected(users)
+        PeriodSpend.objects.bulk_create(
+            (PeriodSpend(**dict(zip(KEY_FIELDS, key)), total=total, count=count)
+             for key, (total, count) in counters.items()),
+            batch_size=batch_size,
+        )
+    return len(counters)
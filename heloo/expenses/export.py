@@ -0,0 +1,50 @@
+"""
+Streaming expense export.
+
+Rows are read with ``values_list().iterator()`` and encoded one at a time,
+so memory stays flat no matter how many expenses are exported.
+"""
+import csv
+import json
+
+FIELDS = ['id', 'date', 'amount', 'category', 'currency', 'notes', 'is_recurring', 'recurring_frequency']
+# values_list() lookups behind FIELDS
+COLUMNS = ['id', 'date', 'amount', 'category__name', 'currency', 'notes', 'is_recurring', 'recurring_frequency']
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    for row in queryset.values_list(*COLUMNS).iterator(chunk_size=CHUNK_SIZE):
+        row = list(row)
+        row[1] = row[1].isoformat()
+        yield row
+
+
+def stream_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in _rows(queryset):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(queryset):
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(FIELDS, row))) + '\n'
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
@@ -0,0 +1,231 @@
+"""
+Spending forecasts and savings-goal projections.
+
+``fit`` reads a user's DailySpend rollup for the last HISTORY_DAYS in one
+columnar fetch. It fits every category at once, with a single least-squares
+solve over a (day x category) matrix: a linear trend plus weekday and
+day-of-month seasonality. The coefficients are stored in SpendForecast.
+The fit is the expensive part, and ``precompute_forecasts`` refits every
+user nightly with a process pool; a request only refits when the stored
+fit is from an earlier day or in another currency.
+
+``project`` evaluates the stored model over the rest of the year as one
+(category x day) array. It combines that with the current-window spend
+counters to give month-end spend per category, the day each budget is
+projected to overrun and, from each goal's saving pace so far, the day it
+completes. Its cost does not depend on the length of the history.
+
+NumPy is optional: without it ``available()`` is False and the forecast
+endpoint answers 503.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import counters
+from .budgets import convert_spend
+from .fx import REFERENCE_CURRENCY, RateTable, user_currency
+from .models import Budget, Category, DailySpend, SavingsGoal, SpendForecast
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+HISTORY_DAYS = 730
+# Shorter histories fit fewer terms: a flat average below MIN_WEEKLY_DAYS,
+# no day-of-month terms below MIN_MONTHLY_DAYS.
+MIN_WEEKLY_DAYS = 14
+MIN_MONTHLY_DAYS = 90
+# slope, 7 weekday terms, 31 day-of-month terms
+TERMS = 1 + 7 + 31
+
+
+def available():
+    return np is not None
+
+
+def _calendar(first, last):
+    """``(days, weekday, day of month - 1)`` arrays for ``first``..``last``."""
+    days = np.arange(np.datetime64(first, 'D'), np.datetime64(last, 'D') + 1)
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekday = (days.astype(np.int64) + 3) % 7
+    day_of_month = (days - days.astype('datetime64[M]')).astype(np.int64)
+    return days, weekday, day_of_month
+
+
+def fit(user, today=None, currency=None):
+    """Fit ``user``'s per-category daily spend up to yesterday, in ``currency``, and store it."""
+    today = today or timezone.localdate()
+    last = today - timedelta(days=1)
+    currency = currency or user_currency(user)
+    rows = list(
+        DailySpend.objects.filter(user=user, day__gte=last - timedelta(days=HISTORY_DAYS - 1), day__lte=last)
+        .values_list('day', 'category_id', 'currency', 'total')
+    )
+
+    coefficients = {}
+    history_days = 0
+    if rows:
+        days, category_ids, currencies, totals = zip(*rows)
+        first = min(days)
+        history_days = (last - first).days + 1
+        rates = RateTable(currency, first, last)
+        amounts = np.asarray(totals, dtype=float) * np.fromiter(
+            (rates.factor(code, day) for code, day in zip(currencies, days)), float, len(rows)
+        )
+        offsets = np.fromiter((day.toordinal() for day in days), np.int64, len(rows)) - first.toordinal()
+        ids, columns = np.unique(np.asarray(category_ids), return_inverse=True)
+        series = np.zeros((history_days, len(ids)))
+        np.add.at(series, (offsets, columns), amounts)
+
+        solved = np.zeros((TERMS, len(ids)))
+        if history_days < MIN_WEEKLY_DAYS:
+            solved[1:8] = series.mean(axis=0)
+        else:
+            calendar_days, weekday, day_of_month = _calendar(first, last)
+            design = [(calendar_days - np.datetime64(last, 'D')).astype(float)[:, None], np.eye(7)[weekday]]
+            if history_days >= MIN_MONTHLY_DAYS:
+                design.append(np.eye(31)[day_of_month])
+            design = np.hstack(design)
+            # The weekday and day-of-month indicators both sum to one; lstsq
+            # returns the minimum-norm split of the level between them.
+            solution, *_ = np.linalg.lstsq(design, series, rcond=None)
+            solved[:design.shape[1]] = solution
+        coefficients = {str(category_id): column.round(6).tolist() for category_id, column in zip(ids.tolist(), solved.T)}
+
+    forecast, _ = SpendForecast.objects.update_or_create(user=user, defaults={
+        'fitted_on': today, 'currency': currency, 'history_days': history_days, 'coefficients': coefficients,
+    })
+    return forecast
+
+
+def fit_users(user_ids, today=None):
+    """Refit ``user_ids``; the unit of work of the nightly batch. Returns the number fitted."""
+    for user in User.objects.filter(id__in=user_ids):
+        fit(user, today)
+    return len(user_ids)
+
+
+def _stored_fit(user, today, currency):
+    forecast = SpendForecast.objects.filter(user=user).first()
+    if forecast is None or forecast.fitted_on != today or forecast.currency != currency:
+        forecast = fit(user, today, currency)
+    return forecast
+
+
+def _period_end(period, today):
+    if period == 'yearly':
+        return today.replace(month=12, day=31)
+    next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def project(user, now=None):
+    """Month-end spend, budget overrun dates and goal completion dates for ``user``."""
+    today = timezone.localdate(now)
+    currency = user_currency(user)
+    forecast = _stored_fit(user, today, currency)
+    rates = RateTable(REFERENCE_CURRENCY, today, today)
+
+    # Predicted daily spend per category from tomorrow to the end of the year
+    ids = [int(category_id) for category_id in forecast.coefficients]
+    rows = {category_id: row for row, category_id in enumerate(ids)}
+    model = np.asarray(list(forecast.coefficients.values()), dtype=float).reshape(len(ids), TERMS)
+    tomorrow = today + timedelta(days=1)
+    days, weekday, day_of_month = _calendar(tomorrow, _period_end('yearly', today))
+    trend = (days - np.datetime64(forecast.fitted_on - timedelta(days=1), 'D')).astype(float)
+    predicted = np.clip(
+        model[:, :1] * trend + model[:, 1:8][:, weekday] + model[:, 8:][:, day_of_month], 0, None,
+    )
+
+    # {(category_id, period): {currency: amount}}
+    spent_by = counters.current_spend(user, now)
+    month_days = (_period_end('monthly', today) - today).days
+    month = {}
+    for category_id in set(rows) | {category_id for category_id, period in spent_by if period == 'monthly'}:
+        spent = convert_spend(spent_by.get((category_id, 'monthly'), {}), currency, rates, today)
+        ahead = predicted[rows[category_id], :month_days].sum() if category_id in rows else 0.0
+        month[category_id] = (spent, spent + float(ahead))
+    names = dict(Category.objects.filter(id__in=month).values_list('id', 'name'))
+    categories = sorted(
+        ({'category': names[category_id], 'spent': round(spent, 2), 'projected': round(projected, 2)}
+         for category_id, (spent, projected) in month.items() if category_id in names),
+        key=lambda entry: -entry['projected'],
+    )
+
+    budgets = []
+    for budget in Budget.objects.filter(user=user).select_related('category'):
+        spent = convert_spend(spent_by.get((budget.category_id, budget.period), {}), budget.currency, rates, today)
+        horizon = (_period_end(budget.period, today) - today).days
+        if budget.category_id in rows:
+            factor = rates.factor(currency, today) / rates.factor(budget.currency, today)
+            cumulative = spent + np.cumsum(predicted[rows[budget.category_id], :horizon]) * factor
+        else:
+            cumulative = np.full(horizon, spent)
+        projected = float(cumulative[-1]) if horizon else spent
+        if spent > budget.limit:
+            overrun = today
+        elif projected > budget.limit:
+            overrun = tomorrow + timedelta(days=int(np.argmax(cumulative > budget.limit)))
+        else:
+            overrun = None
+        budgets.append({
+            'id': budget.id,
+            'category': budget.category.name,
+            'period': budget.period,
+            'currency': budget.currency,
+            'limit': budget.limit,
+            'spent': round(spent, 2),
+            'projected': round(projected, 2),
+            'overrun_date': overrun,
+        })
+
+    return {
+        'currency': currency,
+        'as_of': today,
+        'fitted_on': forecast.fitted_on,
+        'history_days': forecast.history_days,
+        'month_end': {
+            'spent': round(sum(spent for spent, _ in month.values()), 2),
+            'projected': round(sum(projected for _, projected in month.values()), 2),
+            'categories': categories,
+        },
+        'budgets': budgets,
+        'goals': _project_goals(user, today),
+    }
+
+
+def _project_goals(user, today):
+    """Completion dates at each goal's average saving pace since it was created."""
+    goals = list(SavingsGoal.objects.filter(user=user).order_by('deadline', 'id'))
+    if not goals:
+        return []
+    target = np.array([goal.target_amount for goal in goals], dtype=float)
+    saved = np.array([goal.current_amount for goal in goals], dtype=float)
+    elapsed = np.array([(today - timezone.localdate(goal.created_at)).days for goal in goals], dtype=float)
+    left = np.array([(goal.deadline - today).days for goal in goals], dtype=float)
+
+    remaining = np.maximum(target - saved, 0)
+    pace = saved / np.maximum(elapsed, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_needed = np.where(remaining == 0, 0, np.ceil(remaining / pace))
+    required = remaining / np.maximum(left, 1)
+
+    data = []
+    for goal, need, daily, per_day_required in zip(goals, days_needed.tolist(), pace.tolist(), required.tolist()):
+        completion = today + timedelta(days=int(need)) if need <= (date.max - today).days else None
+        data.append({
+            'id': goal.id,
+            'name': goal.name,
+            'currency': goal.currency,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'deadline': goal.deadline,
+            'saved_per_day': round(daily, 2),
+            'required_per_day': round(per_day_required, 2),
+            'completion_date': completion,
+            'on_track': completion is not None and completion <= goal.deadline,
+        })
+    return data
@@ -0,0 +1,130 @@
+"""
+Currency conversion against the local ExchangeRate table.
+
+Rates are stored as the value of one unit of a currency in the reference
+currency (INR), so converting from A to B multiplies by ``rate(A) / rate(B)``
+taken on the same day. Conversion is applied to grouped totals (one factor
+per currency and day), never to individual expenses.
+"""
+import bisect
+import csv
+import json
+
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.dateparse import parse_date
+
+from .models import Expense, ExchangeRate, UserSettings
+
+REFERENCE_CURRENCY = 'INR'
+CURRENCIES = {code for code, _ in Expense.CURRENCY_CHOICES}
+
+
+def user_currency(user):
+    currency = UserSettings.objects.filter(user=user).values_list('currency', flat=True).first()
+    return currency or REFERENCE_CURRENCY
+
+
+class RateTable:
+    """
+    Conversion factors into ``target`` for days in ``[start, end]``.
+
+    All rates the span needs are fetched in one query on first use and every
+    factor is memoized, so a request pays for one small query no matter how
+    many grouped rows it converts. Currencies with no rate at all are left
+    unconverted and listed in ``missing``.
+    """
+
+    def __init__(self, target, start=None, end=None):
+        self.target = target
+        self.start = start
+        self.end = end
+        self.missing = set()
+        self._series = None
+        self._factors = {}
+
+    def _load(self):
+        rates = ExchangeRate.objects.all()
+        if self.start is not None:
+            # The latest rate before the span still applies to its first days.
+            latest_before = ExchangeRate.objects.filter(
+                currency=OuterRef('currency'), date__lt=self.start
+            ).order_by('-date').values('date')[:1]
+            rates = rates.filter(Q(date__gte=self.start) | Q(date=Subquery(latest_before)))
+        if self.end is not None:
+            rates = rates.filter(date__lte=self.end)
+
+        series = {}
+        for currency, date, rate in rates.order_by('currency', 'date').values_list('currency', 'date', 'rate'):
+            dates, values = series.setdefault(currency, ([], []))
+            dates.append(date)
+            values.append(rate)
+        self._series = series
+
+    def load(self):
+        """Fetch the rates now rather than on first use."""
+        if self._series is None:
+            self._load()
+        return self
+
+    def rate(self, currency, day):
+        """Value of one unit of ``currency`` in the reference currency on ``day``."""
+        if currency == REFERENCE_CURRENCY:
+            return 1.0
+        if self._series is None:
+            self._load()
+        if currency not in self._series:
+            return None
+        dates, values = self._series[currency]
+        # Latest rate on or before the day; before the first known rate use the earliest.
+        index = bisect.bisect_right(dates, day) - 1 if day is not None else len(dates) - 1
+        return values[max(index, 0)]
+
+    def factor(self, currency, day=None):
+        key = (currency, day)
+        if key not in self._factors:
+            if currency == self.target:
+                factor = 1.0
+            else:
+                source, target = self.rate(currency, day), self.rate(self.target, day)
+                if source is None or target is None:
+                    self.missing.add(currency if source is None else self.target)
+                    factor = 1.0
+                else:
+                    factor = source / target
+            self._factors[key] = factor
+        return self._factors[key]
+
+
+def read_rates(f, name=''):
+    """
+    Yield ``(date, currency, rate)`` from a CSV (``date,currency,rate``) or a
+    JSON file (``{"2026-01-31": {"USD": 83.2, ...}, ...}``).
+    """
+    if name.endswith('.json'):
+        for day, rates in json.load(f).items():
+            for currency, rate in rates.items():
+                yield day, currency, rate
+    else:
+        for row in csv.DictReader(f):
+            yield row['date'], row['currency'], row['rate']
+
+
+def load_rates(rows, batch_size=1000):
+    """Upsert rates; returns the number of rows written."""
+    objs = []
+    for day, currency, rate in rows:
+        parsed = parse_date(str(day).strip())
+        currency = str(currency).strip().upper()
+        if parsed is None:
+            raise ValueError(f"Invalid date: {day!r}")
+        if currency not in CURRENCIES:
+            raise ValueError(f"Unknown currency: {currency!r}")
+        rate = float(rate)
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive: {currency} {day} {rate}")
+        objs.append(ExchangeRate(date=parsed, currency=currency, rate=rate))
+    ExchangeRate.objects.bulk_create(
+        objs, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['currency', 'date'], update_fields=['rate'],
+    )
+    return len(objs)
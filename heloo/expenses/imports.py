@@ -0,0 +1,165 @@
+"""
+Streaming CSV import of expenses.
+
+The file is read row by row, each row is checked against the Expense field
+rules, and valid rows are inserted with ``bulk_create`` in batches (their
+category names resolved with one lookup per batch). Invalid
+rows are skipped and reported by line number. With ``dry_run`` nothing is
+written but the report is the same. A file the csv module cannot parse
+(e.g. a field over its size limit) is rejected as a whole.
+
+Expected header (only ``amount`` and ``category`` are required)::
+
+    date,amount,category,currency,notes,is_recurring,recurring_frequency
+"""
+import csv
+import math
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import categories, signals
+from .models import Category, Expense
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_COLUMNS = {'amount', 'category'}
+
+CATEGORY_MAX_LENGTH = Category._meta.get_field('name').max_length
+CURRENCIES = {code for code, _ in Expense.CURRENCY_CHOICES}
+FREQUENCIES = {code for code, _ in Expense._meta.get_field('recurring_frequency').choices}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n', 'f'}
+
+
+class InvalidImportFile(ValueError):
+    """The file as a whole cannot be imported (e.g. missing columns)."""
+
+
+def parse_row(row, now=None):
+    """Return ``(fields, errors)`` for one CSV row given as a dict."""
+    fields, errors = {}, {}
+
+    amount = (row.get('amount') or '').strip()
+    try:
+        fields['amount'] = float(amount)
+        if not math.isfinite(fields['amount']):
+            raise ValueError
+    except ValueError:
+        errors['amount'] = ['A valid number is required.']
+
+    category = (row.get('category') or '').strip()
+    if not category:
+        errors['category'] = ['This field may not be blank.']
+    elif len(category) > CATEGORY_MAX_LENGTH:
+        errors['category'] = [f'Ensure this field has no more than {CATEGORY_MAX_LENGTH} characters.']
+    fields['category'] = category
+
+    currency = (row.get('currency') or '').strip().upper() or 'INR'
+    if currency not in CURRENCIES:
+        errors['currency'] = [f'"{currency}" is not a valid choice.']
+    fields['currency'] = currency
+
+    date = (row.get('date') or '').strip()
+    if date:
+        try:
+            parsed = parse_datetime(date)
+            if parsed is None:
+                day = parse_date(date)
+                if day is None:
+                    raise ValueError
+                parsed = datetime(day.year, day.month, day.day)
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            fields['date'] = parsed
+        except ValueError:
+            errors['date'] = ['Enter a valid date or datetime (ISO 8601).']
+    else:
+        fields['date'] = now or timezone.now()
+
+    is_recurring = (row.get('is_recurring') or '').strip().lower()
+    if is_recurring in TRUE_VALUES:
+        fields['is_recurring'] = True
+    elif is_recurring in FALSE_VALUES:
+        fields['is_recurring'] = False
+    else:
+        errors['is_recurring'] = ['Must be a valid boolean.']
+
+    frequency = (row.get('recurring_frequency') or '').strip().lower() or None
+    if frequency is not None and frequency not in FREQUENCIES:
+        errors['recurring_frequency'] = [f'"{frequency}" is not a valid choice.']
+    fields['recurring_frequency'] = frequency
+
+    fields['notes'] = (row.get('notes') or '').strip() or None
+    return fields, errors
+
+
+def import_csv(user, lines, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Import expenses for ``user`` from an iterable of CSV text lines.
+
+    Returns a report dict with the number of valid / imported rows and the
+    per-row errors (capped at MAX_REPORTED_ERRORS).
+    """
+    reader = csv.DictReader(lines)
+    try:
+        columns = {name.strip().lower() for name in reader.fieldnames or []}
+    except csv.Error as e:
+        raise _malformed(reader, e) from e
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise InvalidImportFile(f"Missing required column(s): {', '.join(sorted(missing))}.")
+
+    now = timezone.now()
+    valid = imported = error_count = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal imported, batch
+        if batch and not dry_run:
+            by_key = categories.resolve(user, [fields['category'] for fields in batch])
+            expenses = [
+                Expense(user=user, **{**fields, 'category': by_key[categories.normalize(fields['category'])]})
+                for fields in batch
+            ]
+            with signals.muted():
+                Expense.objects.bulk_create(expenses)
+            signals.expenses_changed(added=expenses)
+            imported += len(expenses)
+        batch = []
+
+    with transaction.atomic():
+        try:
+            for row in reader:
+                row = {(key or '').strip().lower(): value for key, value in row.items()}
+                fields, row_errors = parse_row(row, now)
+                if row_errors:
+                    error_count += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({'line': reader.line_num, 'errors': row_errors})
+                    continue
+                valid += 1
+                batch.append(fields)
+                if len(batch) >= batch_size:
+                    flush()
+        except csv.Error as e:
+            # Leaving the atomic block rolls back the batches already written
+            raise _malformed(reader, e) from e
+        flush()
+
+    return {
+        'dry_run': dry_run,
+        'valid': valid,
+        'imported': imported,
+        'error_count': error_count,
+        'errors': errors,
+    }
+
+
+def _malformed(reader, error):
+    """The InvalidImportFile for a line the csv module cannot parse at all."""
+    # line_num counts the lines parsed so far; the failing one is next
+    return InvalidImportFile(f"Malformed CSV at line {reader.line_num + 1}: {error}.")
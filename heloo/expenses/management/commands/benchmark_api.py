@@ -0,0 +1,238 @@
+import http.client
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.middleware import percentile
+
+# name, method, path; {expense}, {budget} and {goal} are ids owned by the client's user
+ENDPOINTS = [
+    ('expense-list', 'GET', '/api/expenses/'),
+    ('expense-list-page', 'GET', '/api/expenses/?limit=50'),
+    ('expense-detail', 'GET', '/api/expenses/{expense}/'),
+    ('expense-search', 'GET', '/api/expenses/search/?q=coffee'),
+    ('expense-export', 'GET', '/api/expenses/export/?output=csv'),
+    ('expense-anomalies', 'GET', '/api/expenses/anomalies/'),
+    ('analytics', 'GET', '/api/analytics/'),
+    ('analytics-async', 'GET', '/api/analytics/async/'),
+    ('analytics-timeseries', 'GET', '/api/analytics/timeseries/?granularity=week'),
+    ('budget-list', 'GET', '/api/budgets/'),
+    ('budget-detail', 'GET', '/api/budgets/{budget}/'),
+    ('budget-status', 'GET', '/api/budget-status/'),
+    ('budget-alerts', 'GET', '/api/budget-alerts/'),
+    ('forecast', 'GET', '/api/forecast/'),
+    ('goal-list', 'GET', '/api/goals/'),
+    ('goal-detail', 'GET', '/api/goals/{goal}/'),
+    ('settings', 'GET', '/api/settings/'),
+]
+WRITE_ENDPOINTS = [
+    ('expense-create', 'POST', '/api/expenses/'),
+]
+
+
+class Client:
+    """One logged-in browser-like session over a keep-alive connection."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+        self.cookies = {}
+        self.ids = {}
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        headers = {'Accept': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        if method != 'GET':
+            headers['Content-Type'] = content_type
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = f"{self._origin()}/"
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server closed the kept-alive connection; retry once on a new one.
+                self.connection.close()
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie(header)
+            self.cookies.update({key: morsel.value for key, morsel in cookie.items()})
+        return response.status, data
+
+    def _origin(self):
+        scheme = 'https' if isinstance(self.connection, http.client.HTTPSConnection) else 'http'
+        return f"{scheme}://{self.connection.host}:{self.connection.port}"
+
+    def login(self, username, password):
+        self.request('GET', '/login/')
+        status, _ = self.request('POST', '/login/', urlencode({
+            'username': username, 'password': password,
+            'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+        }), content_type='application/x-www-form-urlencoded')
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise CommandError(f"Could not log in as '{username}' (HTTP {status}).")
+        for key, path in (('expense', '/api/expenses/?limit=1'), ('budget', '/api/budgets/'), ('goal', '/api/goals/')):
+            status, data = self.request('GET', path)
+            rows = json.loads(data) if status == 200 else []
+            rows = rows['results'] if isinstance(rows, dict) else rows
+            self.ids[key] = rows[0]['id'] if rows else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the /api/ endpoints of a running server with concurrent logged-in clients and report "
+        "throughput and latency percentiles per endpoint. Seed users first with seed_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--prefix', default='loadtest_', help="Username prefix used by seed_data.")
+        parser.add_argument('--users', type=int, default=10, help="Log in as this many seeded users.")
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=2, help="Unmeasured requests per client and endpoint.")
+        parser.add_argument('--only', help="Comma-separated endpoint names to run.")
+        parser.add_argument('--writes', action='store_true', help="Also benchmark write endpoints (creates expenses).")
+        parser.add_argument('--output', default='benchmark-results.json', help="Write results as JSON here.")
+        parser.add_argument('--compare', help="Earlier results JSON to compare against.")
+        parser.add_argument('--threshold', type=float, default=10.0, help="Flag p95 / throughput changes above this %%.")
+
+    def handle(self, *args, **options):
+        endpoints = ENDPOINTS + (WRITE_ENDPOINTS if options['writes'] else [])
+        if options['only']:
+            wanted = {name.strip() for name in options['only'].split(',')}
+            unknown = wanted - {name for name, _, _ in endpoints}
+            if unknown:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in wanted]
+        concurrency = max(1, options['concurrency'])
+
+        clients = []
+        for n in range(concurrency):
+            client = Client(options['base_url'])
+            client.login(f"{options['prefix']}{n % options['users']}", options['password'])
+            clients.append(client)
+
+        results = {}
+        for name, method, path in endpoints:
+            results[name] = self.run_endpoint(clients, method, path, options)
+            row = results[name]
+            self.stdout.write(
+                f"{name:<20} {row['throughput_rps']:8.1f} req/s  p50 {row['p50_ms']:8.1f}  "
+                f"p95 {row['p95_ms']:8.1f}  p99 {row['p99_ms']:8.1f} ms  errors {row['errors']}"
+            )
+
+        report = {
+            'meta': {
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'commit': git_commit(),
+                'base_url': options['base_url'],
+                'concurrency': concurrency,
+                'requests_per_endpoint': options['requests'],
+                'users': min(options['users'], concurrency),
+                'writes': options['writes'],
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def run_endpoint(self, clients, method, template, options):
+        def body_for(client):
+            if method == 'POST':
+                return json.dumps({'amount': 12.5, 'category': 'Benchmark', 'notes': 'benchmark_api'})
+            return None
+
+        per_client = [options['requests'] // len(clients)] * len(clients)
+        for i in range(options['requests'] % len(clients)):
+            per_client[i] += 1
+        latencies, errors = [], 0
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(clients))
+
+        def work(client, count):
+            nonlocal errors
+            path = template.format(**client.ids) if '{' in template else template
+            for _ in range(options['warmup']):
+                client.request(method, path, body_for(client))
+            barrier.wait()
+            local, failed = [], 0
+            for _ in range(count):
+                start = time.perf_counter()
+                try:
+                    status, _ = client.request(method, path, body_for(client))
+                except (http.client.HTTPException, OSError):
+                    status = None
+                local.append((time.perf_counter() - start) * 1000)
+                if status is None or status >= 400:
+                    failed += 1
+            with lock:
+                latencies.extend(local)
+                errors += failed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+            list(pool.map(work, clients, per_client))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'method': method,
+            'path': template,
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'max_ms': round(latencies[-1], 2) if latencies else None,
+        }
+
+    def compare(self, path, results, threshold):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)['endpoints']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        self.stdout.write(f"\nCompared with {path}:")
+        for name, row in results.items():
+            old = baseline.get(name)
+            if not old or not old.get('p95_ms') or not old.get('throughput_rps') or row['p95_ms'] is None:
+                continue
+            p95 = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            rps = (row['throughput_rps'] - old['throughput_rps']) / old['throughput_rps'] * 100
+            line = f"{name:<20} p95 {p95:+7.1f}%  throughput {rps:+7.1f}%"
+            if p95 > threshold or rps < -threshold:
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            elif p95 < -threshold or rps > threshold:
+                self.stdout.write(self.style.SUCCESS(line + "  improved"))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from expenses import categories, signals
+from expenses.models import Expense
+from expenses.serializers import ExpenseSerializer, FastExpenseSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of ExpenseSerializer and FastExpenseSerializer on the same rows (nothing is kept)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N runs per serializer.")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        try:
+            with transaction.atomic(), signals.muted():
+                user = User.objects.create(username='__benchmark_serializers__')
+                by_key = categories.resolve(user, [f"category {i}" for i in range(12)])
+                Expense.objects.bulk_create(
+                    [
+                        Expense(user=user, amount=i * 1.25, category=by_key[f"category {i % 12}"],
+                                notes=f"note {i}" if i % 3 else None, currency='INR')
+                        for i in range(rows)
+                    ],
+                    batch_size=1000,
+                )
+                self.run(
+                    Expense.objects.filter(user=user).select_related('category').order_by('-date'),
+                    rows, options['repeat'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, queryset, rows, repeat):
+        renderer = JSONRenderer()
+        results = {}
+        for name, serialize in (
+            ('ExpenseSerializer', lambda: ExpenseSerializer(queryset.all(), many=True).data),
+            ('FastExpenseSerializer', lambda: FastExpenseSerializer().serialize(queryset.all())),
+        ):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = renderer.render(serialize())
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = (best, body)
+            self.stdout.write(f"{name:<24} {best * 1000:9.1f} ms  {rows / best:12,.0f} rows/sec")
+
+        (slow, slow_body), (fast, fast_body) = results.values()
+        if slow_body != fast_body:
+            raise CommandError("Fast serializer output differs from ExpenseSerializer.")
+        self.stdout.write(self.style.SUCCESS(f"Output identical; speedup {slow / fast:.1f}x"))
@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import anomalies, batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag unusually large expenses among those added since the last run, per user and category, "
+        "split across a process pool. Each run only reads expenses above the users' high-water marks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help="Only scan this username (repeatable).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes; with 1, or on SQLite, scans run in this process.")
+        parser.add_argument('--chunk-size', type=int, default=50, help="Users per task handed to a worker.")
+        parser.add_argument('--batch-size', type=int, default=anomalies.BATCH_SIZE,
+                            help="Expenses scored per transaction.")
+
+    def handle(self, *args, **options):
+        if not anomalies.available():
+            raise CommandError("Anomaly detection requires NumPy, which is not installed.")
+
+        if options['users']:
+            try:
+                user_ids = batch.user_ids(options['users'])
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+        else:
+            user_ids = anomalies.pending_users()
+
+        flagged, workers = batch.run(
+            anomalies.scan_users, user_ids, max(1, options['batch_size']),
+            chunk_size=options['chunk_size'], workers=options['workers'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {len(user_ids)} user(s) with {workers} worker(s); flagged {flagged} expense(s)."
+        ))
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from expenses.models import Budget, BudgetAlert, Expense, ExpenseAnomaly, SavingsGoal
+from expenses.serializers import ExpenseSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every read API view, and the lookups of the bulk endpoint, for a user and print the query plan "
+        "of each SELECT they issue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to run the views as (defaults to the user with most expenses).")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        scans = []
+        # Some views write (user_settings uses get_or_create, bulk applies its
+        # operations), so nothing here is kept.
+        with transaction.atomic():
+            for label, method, url, params in self.endpoints(user):
+                with CaptureQueriesContext(connection) as ctx:
+                    if method == 'POST':
+                        response = client.post(url, params, format='json')
+                    else:
+                        response = client.get(url, params)
+                    if response.streaming:
+                        # Streamed bodies run their queries while being consumed
+                        b''.join(response.streaming_content)
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{label}  {url}  [{response.status_code}]"))
+                for query in ctx.captured_queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    self.stdout.write(f"  {sql}")
+                    for line in self.explain(sql):
+                        self.stdout.write(f"    {line}")
+                        if self.is_table_scan(line):
+                            scans.append((label, line))
+            transaction.set_rollback(True)
+
+        if scans:
+            for label, line in scans:
+                self.stdout.write(self.style.WARNING(f"Table scan in {label}: {line}"))
+            raise CommandError(f"{len(scans)} quer{'y' if len(scans) == 1 else 'ies'} fell back to a table scan.")
+        self.stdout.write(self.style.SUCCESS("No table scans found."))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User '{username}' does not exist.")
+        user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No users found.")
+        return user
+
+    def endpoints(self, user):
+        """``(label, method, url, params)`` of every request to explain."""
+        expense = Expense.objects.filter(user=user).order_by('-date').first()
+        budget = Budget.objects.filter(user=user).first()
+        goal = SavingsGoal.objects.filter(user=user).first()
+        alert = BudgetAlert.objects.filter(user=user).order_by('id').first()
+        anomaly = ExpenseAnomaly.objects.filter(user=user).order_by('id').first()
+        date_range = {'start_date': '2000-01-01', 'end_date': '2100-01-01'}
+
+        yield 'expense_list', 'GET', reverse('expenses:expense-list'), {}
+        yield 'expense_list (filtered)', 'GET', reverse('expenses:expense-list'), {'category': 'food', **date_range}
+        yield 'expense_list (page)', 'GET', reverse('expenses:expense-list'), {'limit': 20}
+        if expense:
+            yield 'expense_detail', 'GET', reverse('expenses:expense-detail', args=[expense.id]), {}
+            yield 'expense_search', 'GET', reverse('expenses:expense-search'), {'q': expense.category.name}
+        yield 'expense_export', 'GET', reverse('expenses:expense-export'), date_range
+        yield 'expense_export (ndjson)', 'GET', reverse('expenses:expense-export'), {'output': 'ndjson'}
+        if expense:
+            # The existing-row lookups and derived-store updates of a batch
+            yield 'expense_bulk', 'POST', reverse('expenses:expense-bulk'), [
+                {'op': 'update', 'id': expense.id, 'data': dict(ExpenseSerializer(expense).data)},
+                {'op': 'create', 'data': dict(ExpenseSerializer(expense).data)},
+            ]
+        yield 'expense_anomalies (since)', 'GET', reverse('expenses:expense-anomalies'), {
+            'since': anomaly.id if anomaly else 0,
+        }
+        yield 'analytics', 'GET', reverse('expenses:analytics'), date_range
+        yield 'analytics_timeseries', 'GET', reverse('expenses:analytics-timeseries'), {
+            'granularity': 'month', **date_range,
+        }
+        yield 'analytics_timeseries (tz)', 'GET', reverse('expenses:analytics-timeseries'), {
+            'granularity': 'month', 'tz': 'Asia/Kolkata', **date_range,
+        }
+        yield 'budget_list', 'GET', reverse('expenses:budget-list'), {}
+        if budget:
+            yield 'budget_detail', 'GET', reverse('expenses:budget-detail', args=[budget.id]), {}
+        yield 'budget_status', 'GET', reverse('expenses:budget-status'), {}
+        yield 'budget_alerts (since)', 'GET', reverse('expenses:budget-alerts'), {'since': alert.id if alert else 0}
+        yield 'forecast', 'GET', reverse('expenses:forecast'), {}
+        yield 'goal_list', 'GET', reverse('expenses:goal-list'), {}
+        if goal:
+            yield 'goal_detail', 'GET', reverse('expenses:goal-detail', args=[goal.id]), {}
+        yield 'user_settings', 'GET', reverse('expenses:user-settings'), {}
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            rows = cursor.fetchall()
+        if connection.vendor == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [' '.join(str(col) for col in row) for row in rows]
+
+    def is_table_scan(self, line):
+        line = line.strip().upper()
+        if connection.vendor == 'sqlite':
+            return line.startswith('SCAN ') and 'INDEX' not in line and 'SUBQUERY' not in line
+        return 'SEQ SCAN' in line
@@ -0,0 +1,44 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.imports import BATCH_SIZE, InvalidImportFile, import_csv
+
+
+class Command(BaseCommand):
+    help = "Import expenses for a user from a CSV file (date,amount,category,currency,notes,is_recurring,recurring_frequency)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import.")
+        parser.add_argument('--user', required=True, help="Username that will own the imported expenses.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--errors', help="Write the per-row error report as JSON to this file.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                report = import_csv(user, f, dry_run=options['dry_run'], batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except InvalidImportFile as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w') as f:
+                json.dump(report['errors'], f, indent=2)
+        else:
+            for error in report['errors'][:20]:
+                self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['errors']}"))
+
+        verb = "Would import" if options['dry_run'] else "Imported"
+        count = report['valid'] if options['dry_run'] else report['imported']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} expenses; {report['error_count']} invalid rows skipped."
+        ))
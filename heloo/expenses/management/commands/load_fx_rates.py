@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import cache, conditional
+from expenses.fx import load_rates, read_rates
+
+
+class Command(BaseCommand):
+    help = "Load exchange rates (value of one unit in INR) from a CSV (date,currency,rate) or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON rate file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, newline='') as f:
+                count = load_rates(read_rates(f, path))
+        except OSError as e:
+            raise CommandError(str(e))
+        except (KeyError, ValueError) as e:
+            raise CommandError(f"Invalid rate file: {e}")
+        # Every converted response may have changed.
+        cache.bump_global_version()
+        conditional.bump_all()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {count} exchange rates."))
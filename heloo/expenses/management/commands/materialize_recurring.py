@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from expenses.recurring import materialize
+
+
+class Command(BaseCommand):
+    help = "Create the occurrences of recurring expenses that are due, catching up on any backlog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="Materialize up to this ISO datetime instead of now.")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Users per unit of work.")
+        parser.add_argument('--workers', type=int, default=1, help="Process pool size.")
+
+    def handle(self, *args, **options):
+        now = None
+        if options['until']:
+            now = parse_datetime(options['until'])
+            if now is None or now.tzinfo is None:
+                raise CommandError("--until must be an ISO datetime with a UTC offset.")
+        users, created = materialize(now=now, chunk_size=options['chunk_size'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} occurrences for {users} users."))
@@ -0,0 +1,45 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from expenses import batch, forecast
+from expenses.models import DailySpend
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the spending forecast of every user with recent spend, split across a process pool. "
+        "Run it nightly, after midnight, so forecast requests find today's fit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help="Only refit this username (repeatable).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes; with 1, or on SQLite, fits run in this process.")
+        parser.add_argument('--chunk-size', type=int, default=50, help="Users per task handed to a worker.")
+
+    def handle(self, *args, **options):
+        if not forecast.available():
+            raise CommandError("Forecasting requires NumPy, which is not installed.")
+
+        today = timezone.localdate()
+        if options['users']:
+            try:
+                user_ids = batch.user_ids(options['users'])
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+        else:
+            since = today - timedelta(days=forecast.HISTORY_DAYS)
+            user_ids = sorted(set(
+                DailySpend.objects.filter(day__gte=since).values_list('user_id', flat=True).distinct()
+            ))
+
+        fitted, workers = batch.run(
+            forecast.fit_users, user_ids, today, chunk_size=options['chunk_size'], workers=options['workers'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fitted forecasts for {fitted} user(s) with {workers} worker(s)."
+        ))
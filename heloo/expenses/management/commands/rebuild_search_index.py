@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from expenses import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over expense categories and notes."
+
+    def handle(self, *args, **options):
+        if not search.is_indexed():
+            self.stdout.write("This database uses the unindexed search fallback; nothing to rebuild.")
+            return
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the expense search index."))
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySpend rollup table from raw expenses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help="Only rebuild this username (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['users']:
+            users = list(User.objects.filter(username__in=options['users']))
+            missing = set(options['users']) - {u.username for u in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+        created = rollups.rebuild(users=users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily rollup rows."))
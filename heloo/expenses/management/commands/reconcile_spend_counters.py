@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the PeriodSpend budget counters with totals recomputed from raw expenses, "
+        "report the differences and rebuild the counters if any are found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help="Only reconcile this username (repeatable).")
+        parser.add_argument('--check', action='store_true', help="Only report; exit with an error on differences.")
+        parser.add_argument('--show', type=int, default=20, help="List at most this many differences.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['users']:
+            users = list(User.objects.filter(username__in=options['users']))
+            missing = set(options['users']) - {u.username for u in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        mismatches = counters.diff(users)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Spend counters match the raw expenses."))
+            return
+
+        for key, stored, expected in mismatches[:options['show']]:
+            user_id, start, category_id, currency, period = key
+            self.stdout.write(
+                f"user {user_id} {period} {start} category {category_id} {currency}: "
+                f"stored {self.describe(stored)}, expected {self.describe(expected)}"
+            )
+        if len(mismatches) > options['show']:
+            self.stdout.write(f"... and {len(mismatches) - options['show']} more")
+
+        if options['check']:
+            raise CommandError(f"{len(mismatches)} spend counter(s) differ from the raw expenses.")
+        rebuilt = counters.rebuild(users=users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {len(mismatches)} differing counter(s); rebuilt {rebuilt} counter rows."
+        ))
+
+    @staticmethod
+    def describe(value):
+        if value is None:
+            return "nothing"
+        total, count = value
+        return f"{total:.2f} over {count} expense(s)"
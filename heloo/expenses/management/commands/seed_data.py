@@ -0,0 +1,183 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from expenses import categories, recurring, search, signals
+from expenses.models import Budget, Expense, SavingsGoal, UserSettings
+
+BATCH_SIZE = 1000
+
+# name, relative frequency, typical amount in INR, sample notes
+CATEGORIES = [
+    ('Food', 25, 350, ['lunch', 'dinner with friends', 'takeaway', 'office canteen']),
+    ('Groceries', 18, 1200, ['weekly groceries', 'supermarket run', 'vegetables and fruit']),
+    ('Transport', 15, 220, ['taxi', 'metro card top-up', 'fuel', 'bus pass']),
+    ('Coffee', 12, 180, ['morning coffee', 'café with colleagues']),
+    ('Shopping', 8, 2200, ['clothes', 'electronics', 'household items']),
+    ('Entertainment', 6, 800, ['movie tickets', 'concert', 'streaming rental']),
+    ('Utilities', 3, 1600, ['electricity bill', 'internet', 'mobile recharge', 'water bill']),
+    ('Health', 3, 1100, ['pharmacy', 'doctor visit', 'gym supplements']),
+    ('Subscriptions', 3, 500, ['music streaming', 'cloud storage', 'news subscription']),
+    ('Travel', 2, 6500, ['train tickets', 'hotel', 'flight']),
+    ('Gifts', 2, 1500, ['birthday gift', 'wedding gift']),
+    ('Rent', 1, 18000, ['monthly rent']),
+]
+# Rough INR value of one unit, only used to make amounts look plausible.
+CURRENCIES = [('INR', 70, 1.0), ('USD', 15, 83.0), ('EUR', 10, 90.0), ('GBP', 5, 105.0)]
+RATES = {code: rate for code, _, rate in CURRENCIES}
+GOALS = ['Emergency fund', 'New laptop', 'Vacation', 'Car down payment', 'Wedding', 'Home renovation']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users with expenses, budgets and goals for load testing. "
+        "Users are named <prefix><n> and share one password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--expenses', type=int, default=1000, help="Expenses per user.")
+        parser.add_argument('--budgets', type=int, default=4, help="Budgets per user.")
+        parser.add_argument('--goals', type=int, default=2, help="Savings goals per user.")
+        parser.add_argument('--days', type=int, default=365, help="Spread expense dates over this many past days.")
+        parser.add_argument('--prefix', default='loadtest_')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible data sets.")
+        parser.add_argument('--reset', action='store_true', help="Delete existing users with this prefix first.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not prefix:
+            raise CommandError("--prefix may not be empty.")
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            existing = User.objects.filter(username__startswith=prefix)
+            if existing.exists():
+                if not options['reset']:
+                    raise CommandError(f"Users named '{prefix}*' already exist; pass --reset to replace them.")
+                self.reset(existing)
+
+            users = self.create_users(rng, options)
+            expenses = self.create_expenses(rng, users, options)
+            budgets = self.create_budgets(rng, users, options)
+            goals = self.create_goals(rng, users, options)
+            signals.user_data_touched({user.id for user in users})
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {expenses} expenses, {budgets} budgets and {goals} goals "
+            f"in {time.perf_counter() - started:.1f}s (password: {options['password']!r})."
+        ))
+
+    def reset(self, users):
+        removed = list(Expense.objects.filter(user__in=users).only('id', 'user'))
+        with signals.muted():
+            Expense.objects.filter(user__in=users).delete()
+            users.delete()
+        search.index(removed=removed)
+
+    def create_users(self, rng, options):
+        password = make_password(options['password'])  # hash once, share it
+        users = User.objects.bulk_create([
+            User(username=f"{options['prefix']}{n}", password=password)
+            for n in range(options['users'])
+        ])
+        home = [rng.choices([c for c, _, _ in CURRENCIES], [w for _, w, _ in CURRENCIES])[0] for _ in users]
+        UserSettings.objects.bulk_create(
+            UserSettings(user=user, currency=currency) for user, currency in zip(users, home)
+        )
+        for user, currency in zip(users, home):
+            user.home_currency = currency
+        return users
+
+    def create_expenses(self, rng, users, options):
+        now = timezone.now()
+        names = [name for name, _, _, _ in CATEGORIES]
+        weights = [weight for _, weight, _, _ in CATEGORIES]
+        specs = {name: (amount, notes) for name, _, amount, notes in CATEGORIES}
+
+        created = 0
+        batch = []
+
+        def flush():
+            nonlocal created, batch
+            with signals.muted():
+                Expense.objects.bulk_create(batch)
+            signals.expenses_changed(added=batch)
+            created += len(batch)
+            batch = []
+
+        for user in users:
+            by_key = categories.resolve(user, names)
+            for _ in range(options['expenses']):
+                name = rng.choices(names, weights)[0]
+                typical, notes = specs[name]
+                currency = user.home_currency if rng.random() < 0.9 else rng.choice(list(RATES))
+                amount = rng.lognormvariate(math.log(typical), 0.5) / RATES[currency]
+                # More spending on weekends, during the day
+                date = now - timedelta(days=rng.random() * options['days'])
+                if date.weekday() < 5 and rng.random() < 0.3:
+                    date = now - timedelta(days=rng.random() * options['days'])
+                date = date.replace(hour=rng.randint(8, 22), minute=rng.randint(0, 59))
+                date = min(date, now)
+                # Some rent and subscriptions become monthly templates, due a month on
+                template = name in ('Rent', 'Subscriptions') and rng.random() < 0.2
+                batch.append(Expense(
+                    user=user,
+                    category=by_key[categories.normalize(name)],
+                    amount=round(amount, 2),
+                    currency=currency,
+                    date=date,
+                    notes=rng.choice(notes) if rng.random() < 0.6 else None,
+                    is_recurring=template,
+                    recurring_frequency='monthly' if template else None,
+                    next_occurrence=recurring.occurrence(date, 'monthly', 1) if template else None,
+                ))
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+        if batch:
+            flush()
+        return created
+
+    def create_budgets(self, rng, users, options):
+        budgets = []
+        for user in users:
+            by_key = categories.resolve(user, [name for name, _, _, _ in CATEGORIES])
+            rate = RATES[user.home_currency]
+            for name, weight, typical, _ in rng.sample(CATEGORIES, min(options['budgets'], len(CATEGORIES))):
+                # Around the expected monthly spend, so some budgets end up exceeded
+                expected = options['expenses'] * weight / 100 * typical * 30 / options['days']
+                budgets.append(Budget(
+                    user=user,
+                    category=by_key[categories.normalize(name)],
+                    limit=round(max(expected, typical) * rng.uniform(0.7, 1.5) / rate, -1) or 10,
+                    period=rng.choice(['monthly', 'monthly', 'yearly']),
+                    currency=user.home_currency,
+                ))
+        Budget.objects.bulk_create(budgets, batch_size=BATCH_SIZE)
+        return len(budgets)
+
+    def create_goals(self, rng, users, options):
+        today = timezone.localdate()
+        goals = []
+        for user in users:
+            for name in rng.sample(GOALS, min(options['goals'], len(GOALS))):
+                target = round(rng.uniform(10_000, 500_000), -2)
+                goals.append(SavingsGoal(
+                    user=user,
+                    name=name,
+                    target_amount=target,
+                    current_amount=round(target * rng.uniform(0, 0.9), 2),
+                    deadline=today + timedelta(days=rng.randint(30, 3 * 365)),
+                    currency=user.home_currency,
+                ))
+        SavingsGoal.objects.bulk_create(goals, batch_size=BATCH_SIZE)
+        return len(goals)
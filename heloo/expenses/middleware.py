@@ -0,0 +1,222 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures wall time, query count and DB time of every
+request, adds a ``Server-Timing`` header, logs slow requests with their
+slowest SQL statement, and keeps the last ``EXPENSES_PERF_WINDOW`` samples per
+endpoint for p50/p95/p99 (see ``stats`` and the staff-only
+/api/performance/ endpoint).
+
+Queries are counted by an execute wrapper installed once on each database
+connection. It only looks up a context variable and reads the clock twice, so
+the middleware is cheap enough to leave on. The context variable also follows
+requests into worker threads (``sync_to_async``), so one request's counters
+can be updated from several threads and take a lock. Samples are per process.
+
+A streamed response runs its queries while the body is sent, after the view
+has returned. Its ``Server-Timing`` header can only cover the time to the
+first byte; the sample and slow-request log are recorded once the body has
+been sent, and include the body's queries.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('expenses.performance')
+
+_current = ContextVar('expenses_request_stats', default=None)
+_samples = {}
+_samples_lock = threading.Lock()
+UNMATCHED = '<unmatched>'
+
+
+def slow_request_ms():
+    return getattr(settings, 'EXPENSES_SLOW_REQUEST_MS', 500)
+
+
+def window():
+    return getattr(settings, 'EXPENSES_PERF_WINDOW', 1000)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'slowest_sql', 'slowest_time', 'lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, sql, elapsed):
+        with self.lock:
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time, self.slowest_sql = elapsed, sql
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - start)
+
+
+def _install(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks that pop their own wrapper keep working.
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(_install, dispatch_uid='expenses.performance')
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} /{match.route}" if match is not None else UNMATCHED
+
+
+def _add_sample(endpoint, sample):
+    with _samples_lock:
+        _samples.setdefault(endpoint, deque(maxlen=window())).append(sample)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list (shared with the benchmark_api command)."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def stats():
+    """p50/p95/p99 wall time (ms) and mean queries / DB time per endpoint, slowest p95 first."""
+    with _samples_lock:
+        snapshot = [(endpoint, list(samples)) for endpoint, samples in _samples.items()]
+    data = []
+    for endpoint, samples in snapshot:
+        if not samples:
+            continue
+        wall = sorted(sample[0] for sample in samples)
+        data.append({
+            'endpoint': endpoint,
+            'count': len(samples),
+            'p50_ms': round(percentile(wall, 0.50), 2),
+            'p95_ms': round(percentile(wall, 0.95), 2),
+            'p99_ms': round(percentile(wall, 0.99), 2),
+            'max_ms': round(wall[-1], 2),
+            'avg_queries': round(sum(sample[1] for sample in samples) / len(samples), 2),
+            'avg_db_ms': round(sum(sample[2] for sample in samples) / len(samples), 2),
+        })
+    return sorted(data, key=lambda row: row['p95_ms'], reverse=True)
+
+
+def reset():
+    with _samples_lock:
+        _samples.clear()
+
+
+def _measured(content, stats, done):
+    """Iterate a streamed body with ``stats`` current, then call ``done``."""
+    iterator = iter(content)
+    try:
+        while True:
+            token = _current.set(stats)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield chunk
+    finally:
+        done()
+
+
+async def _ameasured(content, stats, done):
+    """Async counterpart of ``_measured``."""
+    iterator = aiter(content)
+    try:
+        while True:
+            token = _current.set(stats)
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield chunk
+    finally:
+        done()
+
+
+class PerformanceMiddleware:
+    """Put it first in MIDDLEWARE so the timing covers the rest of the stack."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = (
+            f'app;dur={wall_ms:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+        )
+        endpoint = _endpoint(request)
+        if response.streaming:
+            measure = _ameasured if response.is_async else _measured
+            done = partial(self.record, request, endpoint, stats, start)
+            response.streaming_content = measure(response.streaming_content, stats, done)
+        else:
+            self.record(request, endpoint, stats, start)
+        return response
+
+    def record(self, request, endpoint, stats, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.db_time * 1000
+        _add_sample(endpoint, (wall_ms, stats.queries, db_ms))
+        if wall_ms >= slow_request_ms():
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in DB; slowest query %.0f ms: %s",
+                request.method, request.get_full_path(), endpoint, wall_ms, stats.queries, db_ms,
+                stats.slowest_time * 1000, (stats.slowest_sql or '')[:1000],
+            )
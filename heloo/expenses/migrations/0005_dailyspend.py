@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_spend(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    DailySpend = apps.get_model('expenses', 'DailySpend')
+    grouped = (
+        Expense.objects.filter(user__isnull=False)
+        .annotate(day=TruncDate('date'))
+        .values('user_id', 'day', 'category', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailySpend.objects.bulk_create((DailySpend(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_user_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=100)),
+                ('currency', models.CharField(choices=[('INR', '₹ Indian Rupee'), ('USD', '$ US Dollar'), ('EUR', '€ Euro'), ('GBP', '£ British Pound')], default='INR', max_length=3)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'category', 'currency'), name='dailyspend_unique_key')],
+            },
+        ),
+        migrations.RunPython(populate_daily_spend, migrations.RunPython.noop),
+    ]
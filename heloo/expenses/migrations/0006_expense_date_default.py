@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_dailyspend'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_expense_date_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(choices=[('INR', '₹ Indian Rupee'), ('USD', '$ US Dollar'), ('EUR', '€ Euro'), ('GBP', '£ British Pound')], max_length=3)),
+                ('rate', models.FloatField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('currency', 'date'), name='exchangerate_unique_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:55
+
+from django.db import migrations
+
+# SQLite FTS5 index over expense category and notes. It reads from a view so
+# the owner can be stored as a token ("u<id>") and matched inside the index,
+# and triggers keep it in sync with every write, bulk paths included.
+CREATE_SQL = [
+    """
+    CREATE VIEW expenses_expense_search_source AS
+    SELECT id, 'u' || user_id AS owner, category, notes FROM expenses_expense
+    """,
+    """
+    CREATE VIRTUAL TABLE expenses_expense_fts USING fts5(
+        owner, category, notes,
+        content='expenses_expense_search_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER expenses_expense_fts_insert AFTER INSERT ON expenses_expense BEGIN
+        INSERT INTO expenses_expense_fts(rowid, owner, category, notes)
+        VALUES (new.id, 'u' || new.user_id, new.category, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER expenses_expense_fts_delete AFTER DELETE ON expenses_expense BEGIN
+        INSERT INTO expenses_expense_fts(expenses_expense_fts, rowid, owner, category, notes)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.category, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER expenses_expense_fts_update AFTER UPDATE OF user_id, category, notes ON expenses_expense BEGIN
+        INSERT INTO expenses_expense_fts(expenses_expense_fts, rowid, owner, category, notes)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.category, old.notes);
+        INSERT INTO expenses_expense_fts(rowid, owner, category, notes)
+        VALUES (new.id, 'u' || new.user_id, new.category, new.notes);
+    END
+    """,
+    "INSERT INTO expenses_expense_fts(expenses_expense_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS expenses_expense_fts_update",
+    "DROP TRIGGER IF EXISTS expenses_expense_fts_delete",
+    "DROP TRIGGER IF EXISTS expenses_expense_fts_insert",
+    "DROP TABLE IF EXISTS expenses_expense_fts",
+    "DROP VIEW IF EXISTS expenses_expense_search_source",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # Other databases fall back to the unindexed search in expenses.search.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_userdataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
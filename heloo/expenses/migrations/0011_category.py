@@ -0,0 +1,199 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:20
+
+import importlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+search_index_0010 = importlib.import_module('expenses.migrations.0010_expense_search_index')
+
+# The 0010 index read from a view over expenses_expense, and SQLite refuses to
+# remake a table that a view depends on. From here on the index is a plain
+# FTS5 table written from expenses.signals, with no view or triggers.
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE expenses_expense_fts USING fts5(
+        owner, category, notes,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO expenses_expense_fts(rowid, owner, category, notes)
+    SELECT e.id, 'u' || e.user_id, c.name, e.notes
+    FROM expenses_expense e JOIN expenses_category c ON c.id = e.category_id
+    WHERE e.user_id IS NOT NULL
+    """,
+]
+DROP_FTS_SQL = ["DROP TABLE IF EXISTS expenses_expense_fts"]
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def fold_categories(apps, schema_editor):
+    """Create one Category per user and folded name, and point expenses and budgets at it."""
+    Category = apps.get_model('expenses', 'Category')
+    categories = {}
+    for Model in (apps.get_model('expenses', 'Expense'), apps.get_model('expenses', 'Budget')):
+        pairs = Model.objects.values_list('user_id', 'category').distinct().order_by('user_id', 'category')
+        for user_id, name in pairs.iterator():
+            key = (user_id, normalize(name))
+            if key not in categories:
+                categories[key] = Category.objects.create(
+                    user_id=user_id, name=' '.join(name.split()) or name, key=key[1],
+                )
+            Model.objects.filter(user_id=user_id, category=name).update(category_ref=categories[key])
+
+
+def unfold_categories(apps, schema_editor):
+    Category = apps.get_model('expenses', 'Category')
+    for Model in (apps.get_model('expenses', 'Expense'), apps.get_model('expenses', 'Budget')):
+        for category in Category.objects.iterator():
+            Model.objects.filter(category_ref=category).update(category=category.name)
+    populate_daily_spend(apps, schema_editor, category='category')
+
+
+def populate_daily_spend(apps, schema_editor, category='category_id'):
+    # Folding can merge buckets ("Food" and "food"), so recompute instead of remapping.
+    Expense = apps.get_model('expenses', 'Expense')
+    DailySpend = apps.get_model('expenses', 'DailySpend')
+    DailySpend.objects.all().delete()
+    grouped = (
+        Expense.objects.filter(user__isnull=False)
+        .annotate(day=TruncDate('date'))
+        .values('user_id', 'day', category, 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailySpend.objects.bulk_create((DailySpend(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+def clear_daily_spend(apps, schema_editor):
+    apps.get_model('expenses', 'DailySpend').objects.all().delete()
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_expense_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(search_index_0010.DROP_SQL), run_on_sqlite(search_index_0010.CREATE_SQL),
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='categories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='category_unique_key')],
+            },
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='expenses.category'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='expenses.category'),
+        ),
+        # Nullable, so that unapplying can re-add the columns and then unfold into them.
+        migrations.AlterField(
+            model_name='expense',
+            name='category',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='category',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(fold_categories, unfold_categories),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_user_cat_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='budget',
+            name='budget_user_category_idx',
+        ),
+        migrations.RemoveConstraint(
+            model_name='dailyspend',
+            name='dailyspend_unique_key',
+        ),
+        migrations.RunPython(clear_daily_spend, clear_daily_spend),
+        migrations.RemoveField(
+            model_name='expense',
+            name='category',
+        ),
+        migrations.RemoveField(
+            model_name='budget',
+            name='category',
+        ),
+        migrations.RemoveField(
+            model_name='dailyspend',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='expense',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.RenameField(
+            model_name='budget',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='expenses', to='expenses.category'),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='budgets', to='expenses.category'),
+        ),
+        migrations.AddField(
+            model_name='dailyspend',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.category'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', 'date'], name='expense_user_cat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'category'], name='budget_user_category_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyspend',
+            constraint=models.UniqueConstraint(fields=('user', 'day', 'category', 'currency'), name='dailyspend_unique_key'),
+        ),
+        migrations.RunPython(populate_daily_spend, clear_daily_spend),
+        migrations.RunPython(run_on_sqlite(CREATE_FTS_SQL), run_on_sqlite(DROP_FTS_SQL)),
+    ]
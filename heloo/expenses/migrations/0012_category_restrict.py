@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0011_category'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='budget',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='budgets', to='expenses.category'),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='expenses', to='expenses.category'),
+        ),
+    ]
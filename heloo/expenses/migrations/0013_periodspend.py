@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+
+
+def populate_period_spend(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    PeriodSpend = apps.get_model('expenses', 'PeriodSpend')
+    for period, trunc in (('monthly', TruncMonth), ('yearly', TruncYear)):
+        grouped = (
+            Expense.objects.filter(user__isnull=False)
+            .annotate(start=trunc('date'))
+            .values('user_id', 'start', 'category_id', 'currency')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        PeriodSpend.objects.bulk_create(
+            (PeriodSpend(**{**row, 'start': row['start'].date()}, period=period) for row in grouped.iterator()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_category_restrict'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodSpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateField()),
+                ('currency', models.CharField(choices=[('INR', '₹ Indian Rupee'), ('USD', '$ US Dollar'), ('EUR', '€ Euro'), ('GBP', '£ British Pound')], default='INR', max_length=3)),
+                ('period', models.CharField(choices=[('monthly', 'Monthly'), ('yearly', 'Yearly')], max_length=20)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'start', 'category', 'currency'), name='periodspend_unique_key')],
+            },
+        ),
+        migrations.RunPython(populate_period_spend, migrations.RunPython.noop),
+    ]
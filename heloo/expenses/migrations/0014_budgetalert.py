@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0013_periodspend'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='periodspend',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_spend', to='expenses.category'),
+        ),
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('threshold', models.PositiveSmallIntegerField()),
+                ('spent', models.FloatField()),
+                ('limit', models.FloatField()),
+                ('currency', models.CharField(choices=[('INR', '₹ Indian Rupee'), ('USD', '$ US Dollar'), ('EUR', '€ Euro'), ('GBP', '£ British Pound')], default='INR', max_length=3)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='expenses.budget')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='budgetalert_user_id_idx')],
+                'constraints': [models.UniqueConstraint(fields=('budget', 'period_start', 'threshold'), name='budgetalert_unique_key')],
+            },
+        ),
+    ]
@@ -1,7 +1,26 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+class Category(models.Model):
+    """A user's expense category. ``key`` is the case- and space-folded name that names are matched on."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank= False, related_name='categories')
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name_plural = 'categories'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='category_unique_key'),
+        ]
+
+    @staticmethod
+    def normalize(name):
+        return ' '.join(name.split()).casefold()
+
+    def __str__(self):
+        return self.name
+
 class Expense(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank= False)
     CURRENCY_CHOICES = [
@@ -12,9 +31,10 @@ class Expense(models.Model):
     ]
     
     amount = models.FloatField()
-    category = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.RESTRICT, related_name='expenses')
     notes = models.TextField(blank=True, null=True)
-    date = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so imported and generated rows can keep their own date
+    date = models.DateTimeField(default=timezone.now)
     is_recurring = models.BooleanField(default=False)
     recurring_frequency = models.CharField(
         max_length=20, 
@@ -23,13 +43,41 @@ class Expense(models.Model):
         null=True
     )
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default='INR')
+    # Recurring templates: when the next occurrence is due, and for generated
+    # occurrences, the template they came from.
+    next_occurrence = models.DateTimeField(blank=True, null=True)
+    recurring_source = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='expense_user_cat_date_idx'),
+            models.Index(
+                fields=['next_occurrence'], name='expense_recurring_due_idx',
+                condition=models.Q(is_recurring=True),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recurring_source', 'date'], name='expense_unique_occurrence',
+                condition=models.Q(recurring_source__isnull=False),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Derived stores (rollups, spend counters, search) are updated by the
+        # post_save handler; run it in the same transaction as the write.
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Expense, instance=self)):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.category} - {self.amount}"
 
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank= False)
-    category = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.RESTRICT, related_name='budgets')
     limit = models.FloatField()
     period = models.CharField(
         max_length=20, 
@@ -39,6 +87,11 @@ class Budget(models.Model):
     currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'category'], name='budget_user_category_idx'),
+        ]
+
     def __str__(self):
         return f"{self.category} - {self.limit}"
 
@@ -59,4 +112,153 @@ class UserSettings(models.Model):
     currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
     theme = models.CharField(max_length=20, choices=[('dark', 'Dark'), ('light', 'Light')], default='dark')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True)
+
+class DailySpend(models.Model):
+    """Per-day spend rollup of Expense rows, kept current by expenses.signals."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
+    total = models.FloatField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'category', 'currency'], name='dailyspend_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category} - {self.total}"
+
+class PeriodSpend(models.Model):
+    """
+    Spend per budget period window (the month or year starting on ``start``),
+    kept current by expenses.signals so budget status never scans expenses.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    start = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='period_spend')
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
+    period = models.CharField(max_length=20, choices=[('monthly', 'Monthly'), ('yearly', 'Yearly')])
+    total = models.FloatField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Leading (user, period, start) serves the current-window lookup
+            models.UniqueConstraint(
+                fields=['user', 'period', 'start', 'category', 'currency'], name='periodspend_unique_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.start} {self.category} - {self.total}"
+
+class BudgetAlert(models.Model):
+    """A budget reaching ``threshold`` percent of its limit, recorded once per period window."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    period_start = models.DateField()
+    threshold = models.PositiveSmallIntegerField()
+    spent = models.FloatField()
+    limit = models.FloatField()
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The since= feed reads a user's alerts after a given id
+            models.Index(fields=['user', 'id'], name='budgetalert_user_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start', 'threshold'], name='budgetalert_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget} - {self.threshold}% ({self.period_start})"
+
+class AnomalyScan(models.Model):
+    """High-water mark of the anomaly job: the last expense id scanned for ``user``."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    last_expense_id = models.PositiveBigIntegerField(default=0)
+    scanned_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} up to #{self.last_expense_id}"
+
+class AnomalyBaseline(models.Model):
+    """Running amount statistics of scanned expenses per (user, category, currency)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
+    count = models.FloatField(default=0)
+    mean = models.FloatField(default=0)
+    # Sum of squared deviations from ``mean``
+    m2 = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'currency'], name='anomalybaseline_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} {self.currency} ~{self.mean:.2f}"
+
+class ExpenseAnomaly(models.Model):
+    """An expense flagged as unusually large for its category, ``score`` spreads above the typical amount."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    expense = models.OneToOneField(Expense, on_delete=models.CASCADE, related_name='anomaly')
+    typical = models.FloatField()
+    spread = models.FloatField()
+    score = models.FloatField()
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'expense anomalies'
+        indexes = [
+            # The since= feed reads a user's anomalies after a given id
+            models.Index(fields=['user', 'id'], name='expenseanomaly_user_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.expense} ({self.score:.1f})"
+
+class SpendForecast(models.Model):
+    """
+    Per-category daily spend model of a user, fitted by expenses.forecast on
+    the history up to the day before ``fitted_on``, in ``currency``.
+    ``coefficients`` maps category ids to ``[slope, 7 weekday terms, 31
+    day-of-month terms]``.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    fitted_on = models.DateField()
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES, default='INR')
+    history_days = models.PositiveIntegerField(default=0)
+    coefficients = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"{self.user_id} fitted {self.fitted_on}"
+
+class ExchangeRate(models.Model):
+    """Value of one unit of ``currency`` in the reference currency (INR) on ``date``."""
+    date = models.DateField()
+    currency = models.CharField(max_length=3, choices=Expense.CURRENCY_CHOICES)
+    rate = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'date'], name='exchangerate_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.currency} = {self.rate}"
+
+class UserDataVersion(models.Model):
+    """Write counter per user, bumped on every change to their data; backs ETag / Last-Modified."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
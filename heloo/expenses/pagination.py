@@ -0,0 +1,108 @@
+"""
+Keyset (cursor) pagination for expense listings.
+
+Pages are walked on the ``(date, id)`` pair instead of an OFFSET, so the
+database seeks straight to the next row through the ``(user, date)`` index
+and the cost of a page does not grow with how deep the client has paged.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, row):
+    # Rows end with the (date, id) pair, see paginate_expenses().
+    date, pk = row[-2], row[-1]
+    raw = f"{direction}|{date.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        direction, date, pk = raw.split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Invalid cursor.')
+    if direction not in (NEXT, PREVIOUS) or date is None:
+        raise InvalidCursor('Invalid cursor.')
+    return direction, date, pk
+
+
+def parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('A valid integer is required.')
+    if limit < 1:
+        raise ValueError('Ensure this value is greater than or equal to 1.')
+    return min(limit, MAX_LIMIT)
+
+
+def parse_since(value):
+    """The last id a client has seen in an id-ordered feed (``since=``); 0 when absent."""
+    if value in (None, ''):
+        return 0
+    try:
+        since = int(value)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise ValueError('Must be a non-negative integer.')
+    return since
+
+
+def paginate_expenses(queryset, limit, cursor=None, columns=()):
+    """
+    Return ``(rows, next_cursor, previous_cursor)`` for one page of
+    ``queryset`` in newest-first order. Rows are ``values_list`` tuples of
+    ``columns`` followed by ``date`` and ``id``. Filters already applied to
+    the queryset carry over to every page.
+    """
+    queryset = queryset.values_list(*columns, 'date', 'id')
+    if cursor is None:
+        direction = NEXT
+        rows = list(queryset.order_by('-date', '-id')[:limit + 1])
+    else:
+        direction, date, pk = decode_cursor(cursor)
+        if direction == NEXT:
+            rows = list(
+                queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+                .order_by('-date', '-id')[:limit + 1]
+            )
+        else:
+            rows = list(
+                queryset.filter(Q(date__gt=date) | Q(date=date, id__gt=pk))
+                .order_by('date', 'id')[:limit + 1]
+            )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREVIOUS:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    if direction == NEXT:
+        next_cursor = encode_cursor(NEXT, rows[-1]) if has_more else None
+        previous_cursor = encode_cursor(PREVIOUS, rows[0]) if cursor else None
+    else:
+        next_cursor = encode_cursor(NEXT, rows[-1])
+        previous_cursor = encode_cursor(PREVIOUS, rows[0]) if has_more else None
+    return rows, next_cursor, previous_cursor
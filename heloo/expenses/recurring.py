@@ -0,0 +1,130 @@
+"""
+Materialization of recurring expenses.
+
+A recurring template is an Expense with ``is_recurring`` and a
+``recurring_frequency``. Each run creates the occurrences that fell due since
+the template's ``next_occurrence`` and moves that marker forward, so the work
+done is proportional to the number of due occurrences. Occurrences point back
+to their template. Re-running a window is a no-op: occurrences already
+written are skipped, and the unique (recurring_source, date) constraint
+fails the run rather than count a row twice.
+"""
+import calendar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import batch, signals
+from .models import Expense
+
+BATCH_SIZE = 1000
+# Hard stop for a single template per run, e.g. a daily template decades old.
+MAX_OCCURRENCES_PER_RUN = 5000
+
+
+def add_months(when, months):
+    month = when.month - 1 + months
+    year = when.year + month // 12
+    month = month % 12 + 1
+    day = min(when.day, calendar.monthrange(year, month)[1])
+    return when.replace(year=year, month=month, day=day)
+
+
+def occurrence(start, frequency, n):
+    """The ``n``-th occurrence of a template starting at ``start`` (0 is the template itself)."""
+    if frequency == 'daily':
+        return start + timedelta(days=n)
+    if frequency == 'weekly':
+        return start + timedelta(weeks=n)
+    # Always offset from the template so the 31st stays the 31st (or month end).
+    return add_months(start, n)
+
+
+def occurrence_index(start, frequency, when):
+    """Index of the occurrence that falls on ``when``."""
+    if frequency == 'daily':
+        return (when - start).days
+    if frequency == 'weekly':
+        return (when - start).days // 7
+    return (when.year - start.year) * 12 + when.month - start.month
+
+
+def due_templates(now):
+    return Expense.objects.filter(
+        Q(next_occurrence__lte=now) | Q(next_occurrence__isnull=True),
+        is_recurring=True,
+        recurring_frequency__in=['daily', 'weekly', 'monthly'],
+        user__isnull=False,
+    )
+
+
+def due_user_ids(now):
+    return list(due_templates(now).values_list('user_id', flat=True).distinct().order_by('user_id'))
+
+
+def materialize_users(user_ids, now):
+    """Create every occurrence due by ``now`` for ``user_ids``; returns the number created."""
+    created = 0
+    with transaction.atomic():
+        templates = list(due_templates(now).filter(user_id__in=user_ids).select_for_update())
+        if not templates:
+            return 0
+
+        pending = []
+        for template in templates:
+            start, frequency = template.date, template.recurring_frequency
+            n = 1
+            if template.next_occurrence is not None:
+                n = max(occurrence_index(start, frequency, template.next_occurrence), 1)
+            emitted = 0
+            when = occurrence(start, frequency, n)
+            while when <= now and emitted < MAX_OCCURRENCES_PER_RUN:
+                pending.append(Expense(
+                    user_id=template.user_id,
+                    amount=template.amount,
+                    category_id=template.category_id,
+                    notes=template.notes,
+                    currency=template.currency,
+                    date=when,
+                    recurring_source=template,
+                ))
+                emitted += 1
+                n += 1
+                when = occurrence(start, frequency, n)
+            template.next_occurrence = when
+
+        # Skip anything an earlier, interrupted run already wrote. The templates
+        # are locked, so every row left is new: insert without ignore_conflicts,
+        # which would drop rows silently (and leave them without an id on
+        # SQLite) while the derived stores still counted them.
+        if pending:
+            existing = set(
+                Expense.objects.filter(
+                    recurring_source__in=templates,
+                    date__gte=min(expense.date for expense in pending),
+                ).values_list('recurring_source_id', 'date')
+            )
+            pending = [e for e in pending if (e.recurring_source_id, e.date) not in existing]
+
+        with signals.muted():
+            for i in range(0, len(pending), BATCH_SIZE):
+                batch = pending[i:i + BATCH_SIZE]
+                Expense.objects.bulk_create(batch)
+                signals.expenses_changed(added=batch)
+                created += len(batch)
+            Expense.objects.bulk_update(templates, ['next_occurrence'], batch_size=BATCH_SIZE)
+    return created
+
+
+def materialize(now=None, chunk_size=100, workers=1):
+    """
+    Materialize everything due by ``now``. Users are processed in chunks of
+    ``chunk_size``, across ``workers`` processes (see ``batch.run``).
+    Returns ``(users, created)``.
+    """
+    now = now or timezone.now()
+    user_ids = due_user_ids(now)
+    created, _ = batch.run(materialize_users, user_ids, now, chunk_size=chunk_size, workers=workers)
+    return len(user_ids), created
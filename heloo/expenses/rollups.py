@@ -0,0 +1,147 @@
+"""
+Maintenance of the DailySpend rollup.
+
+Every Expense write is folded into its (user, day, category, currency)
+bucket, so analytics reads a handful of rows per day instead of every
+expense in the range.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySpend, Expense
+
+
+def rollup_key(expense):
+    return (expense.user_id, timezone.localdate(expense.date), expense.category_id, expense.currency)
+
+
+def expense_deltas(expenses, sign=1, deltas=None):
+    """Accumulate ``{key: [amount, count]}`` changes for adding or removing expenses."""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0.0, 0])
+    for expense in expenses:
+        if expense.user_id is None:
+            continue
+        delta = deltas[rollup_key(expense)]
+        delta[0] += sign * expense.amount
+        delta[1] += sign
+    return deltas
+
+
+def apply_expenses(expenses, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) expenses from their buckets."""
+    apply_deltas(expense_deltas(expenses, sign))
+
+
+# Above this many buckets a change set is applied with one read and bulk writes
+# per user instead of one round-trip per bucket.
+BULK_THRESHOLD = 16
+
+KEY_FIELDS = ('user_id', 'day', 'category_id', 'currency')
+
+
+def apply_deltas(deltas, model=DailySpend, key_fields=KEY_FIELDS):
+    """
+    Apply a ``{key: [amount, count]}`` mapping to a counter table: ``model``
+    with ``total`` and ``count`` columns, keyed by ``key_fields`` (user
+    first, then a date field). Rows are created on first use, incremented
+    with F() updates and deleted when their count drops to zero.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    with transaction.atomic():
+        if len(deltas) > BULK_THRESHOLD:
+            _apply_bulk(deltas, model, key_fields)
+            return
+        for key_values, (amount, count) in deltas.items():
+            key = dict(zip(key_fields, key_values))
+            rows = model.objects.select_for_update()
+            if count > 0:
+                row, created = rows.get_or_create(**key, defaults={'total': amount, 'count': count})
+                if created:
+                    continue
+            else:
+                row = rows.filter(**key).first()
+                if row is None:
+                    continue
+            if row.count + count <= 0:
+                row.delete()
+            else:
+                model.objects.filter(pk=row.pk).update(total=F('total') + amount, count=F('count') + count)
+
+
+def _apply_bulk(deltas, model, key_fields):
+    by_user = defaultdict(dict)
+    for key, delta in deltas.items():
+        by_user[key[0]][key] = delta
+
+    date_field, other_fields = key_fields[1], key_fields[2:]
+    for user_id, user_deltas in by_user.items():
+        dates = [key[1] for key in user_deltas]
+        existing = {
+            tuple(row[1:-1]): (row[0], row[-1])
+            for row in model.objects.select_for_update().filter(
+                user_id=user_id,
+                **{f'{date_field}__gte': min(dates), f'{date_field}__lte': max(dates)},
+                **{f'{field}__in': {key[i] for key in user_deltas} for i, field in enumerate(other_fields, 2)},
+            ).values_list('id', *key_fields, 'count')
+        }
+        to_create, to_update, to_delete = [], [], []
+        for key, (amount, count) in user_deltas.items():
+            row = existing.get(key)
+            if row is None:
+                if count > 0:
+                    to_create.append(model(**dict(zip(key_fields, key)), total=amount, count=count))
+            elif row[1] + count <= 0:
+                to_delete.append(row[0])
+            else:
+                to_update.append((amount, count, row[0]))
+        if to_create:
+            model.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update() builds a CASE per row; an executemany of increments
+            # is much cheaper and keeps the F()-style atomic update.
+            table, total_col, count_col, pk_col = map(
+                connection.ops.quote_name, (model._meta.db_table, 'total', 'count', 'id')
+            )
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'UPDATE {table} SET {total_col} = {total_col} + %s, {count_col} = {count_col} + %s '
+                    f'WHERE {pk_col} = %s',
+                    to_update,
+                )
+        if to_delete:
+            model.objects.filter(pk__in=to_delete).delete()
+
+
+def rebuild(users=None, batch_size=1000):
+    """Recompute the rollup from raw expenses, for ``users`` or for everyone."""
+    expenses = Expense.objects.filter(user__isnull=False)
+    rollups = DailySpend.objects.all()
+    if users is not None:
+        expenses = expenses.filter(user__in=users)
+        rollups = rollups.filter(user__in=users)
+
+    grouped = (
+        expenses.annotate(day=TruncDate('date'))
+        .values('user_id', 'day', 'category_id', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(DailySpend(**row))
+            if len(batch) >= batch_size:
+                DailySpend.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailySpend.objects.bulk_create(batch)
+            created += len(batch)
+    return created
@@ -0,0 +1,93 @@
+"""
+Read/write routing between the primary database and an optional read replica.
+
+Only views wrapped in ``replica_reads`` (analytics, budget status, export)
+read from the replica; everything else, and every write, uses ``default``.
+A user who wrote within the last ``EXPENSES_REPLICA_STICKY_SECONDS`` keeps
+reading from the primary so they always see their own writes despite
+replication lag. The last-write time is the UserDataVersion row that the
+conditional-GET layer already reads from the primary.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from . import conditional
+from .models import UserDataVersion
+
+_read_alias = ContextVar('expenses_read_alias', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'EXPENSES_REPLICA_ALIAS', 'replica')
+
+
+def sticky_seconds():
+    return getattr(settings, 'EXPENSES_REPLICA_STICKY_SECONDS', 5)
+
+
+def read_alias_for(request):
+    """The alias this request's reads should use."""
+    alias = replica_alias()
+    if alias not in connections.databases:
+        return DEFAULT_DB_ALIAS
+    if request.user.is_authenticated:
+        _, updated_at = conditional.data_version(request)
+        if updated_at is not None and (timezone.now() - updated_at).total_seconds() < sticky_seconds():
+            return DEFAULT_DB_ALIAS
+    return alias
+
+
+def replica_reads(view):
+    """
+    Send the reads ``view`` makes to the replica (see ``read_alias_for``) and
+    expose the chosen alias as ``request.read_db`` for work done after the
+    view returns, e.g. querysets consumed by a streaming response. Apply it
+    below ``@api_view``/``@permission_classes`` so the request is
+    authenticated.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            request.read_db = await sync_to_async(read_alias_for)(request)
+            token = _read_alias.set(request.read_db)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.read_db = read_alias_for(request)
+        token = _read_alias.set(request.read_db)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """Database router for ``replica_reads``; see the module docstring."""
+
+    def db_for_read(self, model, **hints):
+        if model is UserDataVersion:
+            # Validators and the sticky window must reflect the latest write.
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is fed from the primary, never migrated directly.
+        return db != replica_alias()
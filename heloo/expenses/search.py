@@ -0,0 +1,101 @@
+"""
+Full-text search over expense categories and notes.
+
+On SQLite this uses the FTS5 table created in migration 0011: the owner is a
+token inside the index, terms are prefix-matched and results are ranked with
+bm25 (category hits weigh more than notes). The index is written from
+``signals.expenses_changed`` alongside the other derived stores, so bulk paths
+are indexed in batches. Other databases fall back to an unindexed
+``icontains`` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Category, Expense
+
+FTS_TABLE = 'expenses_expense_fts'
+# bm25 column weights: owner, category, notes
+WEIGHTS = (0.0, 4.0, 1.0)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+CHUNK_SIZE = 500
+
+
+def is_indexed():
+    return connection.vendor == 'sqlite'
+
+
+def index(added=(), removed=()):
+    """Mirror a batch of Expense writes (same shape as expenses_changed) into the index."""
+    if not is_indexed():
+        return
+    removed_ids = [expense.id for expense in removed if expense.id is not None]
+    # The expense id is the FTS rowid. Without one (e.g. a bulk_create that
+    # returned no ids) FTS5 would pick max(rowid) + 1, which names another row.
+    added = [expense for expense in added if expense.user_id is not None and expense.id is not None]
+    with connection.cursor() as cursor:
+        # An update arrives as its old row in removed and its new row in added.
+        for i in range(0, len(removed_ids), CHUNK_SIZE):
+            chunk = removed_ids[i:i + CHUNK_SIZE]
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+        if added:
+            names = dict(
+                Category.objects.filter(id__in={expense.category_id for expense in added}).values_list('id', 'name')
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, owner, category, notes) VALUES (%s, %s, %s, %s)",
+                [
+                    (expense.id, f'u{expense.user_id}', names.get(expense.category_id), expense.notes)
+                    for expense in added
+                ],
+            )
+
+
+def rebuild():
+    """Rebuild the whole index from the expenses table."""
+    if not is_indexed():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, owner, category, notes) "
+            "SELECT e.id, 'u' || e.user_id, c.name, e.notes "
+            "FROM expenses_expense e JOIN expenses_category c ON c.id = e.category_id "
+            "WHERE e.user_id IS NOT NULL"
+        )
+
+
+def build_match(user_id, text):
+    """FTS5 query for ``text`` (every term prefix-matched) within one user's rows."""
+    terms = TOKEN_RE.findall(text)
+    if not terms:
+        return None
+    phrase = ' '.join(f'"{term}"*' for term in terms)
+    return f'owner:"u{user_id}" AND {{category notes}}: ({phrase})'
+
+
+def search_ids(user, text, limit):
+    """Ids of the user's best matching expenses, best first."""
+    if not is_indexed():
+        terms = TOKEN_RE.findall(text)
+        if not terms:
+            return []
+        expenses = Expense.objects.filter(user=user)
+        for term in terms:
+            expenses = expenses.filter(Q(category__name__icontains=term) | Q(notes__icontains=term))
+        return list(expenses.order_by('-date', '-id').values_list('id', flat=True)[:limit])
+
+    match = build_match(user.id, text)
+    if match is None:
+        return []
+    weights = ', '.join(str(w) for w in WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -1,16 +1,61 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Expense, Budget, SavingsGoal, UserSettings
+from rest_framework.settings import api_settings
+from rest_framework.fields import ISO_8601
+from . import categories
+from .models import Category, Expense, ExpenseAnomaly, Budget, BudgetAlert, SavingsGoal, UserSettings
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class CategoryNameSerializer(serializers.ModelSerializer):
+    """
+    Read and write ``category`` as a name. On save the name is resolved to
+    the owner's Category row (created if new), matched case-insensitively.
+    """
+    category = serializers.CharField(source='category.name', max_length=Category._meta.get_field('name').max_length)
+
+    def _resolve_category(self, validated_data, user):
+        if 'category' in validated_data:
+            validated_data['category'] = categories.get(user, validated_data['category']['name'])
+
+    def create(self, validated_data):
+        self._resolve_category(validated_data, validated_data.get('user'))
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        self._resolve_category(validated_data, instance.user)
+        return super().update(instance, validated_data)
+
+class ExpenseSerializer(CategoryNameSerializer):
     class Meta:
         model = Expense
         fields = ['id', 'amount', 'category', 'notes', 'date', 'is_recurring', 'recurring_frequency', 'currency']
+        read_only_fields = ['date']
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetSerializer(CategoryNameSerializer):
     class Meta:
         model = Budget
         fields = ['id', 'category', 'limit', 'period', 'currency']
 
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    category = serializers.CharField(source='budget.category.name', read_only=True)
+    period = serializers.CharField(source='budget.period', read_only=True)
+
+    class Meta:
+        model = BudgetAlert
+        fields = ['id', 'budget', 'category', 'period', 'period_start', 'threshold', 'spent', 'limit', 'currency',
+                  'created_at']
+
+class ExpenseAnomalySerializer(serializers.ModelSerializer):
+    category = serializers.CharField(source='expense.category.name', read_only=True)
+    amount = serializers.FloatField(source='expense.amount', read_only=True)
+    currency = serializers.CharField(source='expense.currency', read_only=True)
+    date = serializers.DateTimeField(source='expense.date', read_only=True)
+    notes = serializers.CharField(source='expense.notes', read_only=True)
+
+    class Meta:
+        model = ExpenseAnomaly
+        fields = ['id', 'expense', 'category', 'amount', 'currency', 'date', 'notes', 'typical', 'spread', 'score',
+                  'detected_at']
+
 class SavingsGoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = SavingsGoal
@@ -19,4 +64,64 @@ class SavingsGoalSerializer(serializers.ModelSerializer):
 class UserSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserSettings
-        fields = ['id', 'currency', 'theme']
\ No newline at end of file
+        fields = ['id', 'currency', 'theme']
+
+class FastExpenseSerializer:
+    """
+    Read-only fast path for expense lists.
+
+    Rows are fetched as ``values_list()`` tuples and rendered through a
+    converter per field compiled once from ExpenseSerializer, so the output
+    is identical to ``ExpenseSerializer(many=True).data`` without building
+    model instances or running DRF field machinery per value. ``fields``
+    restricts the output to a subset of fields (sparse fieldsets).
+    """
+    serializer_class = ExpenseSerializer
+
+    def __init__(self, fields=None):
+        declared = self.serializer_class().fields
+        names = [name for name in declared if fields is None or name in fields]
+        self.names = names
+        # Dotted sources (category.name) become lookups (category__name)
+        self.sources = [declared[name].source.replace('.', '__') for name in names]
+        self.converters = [self._converter(declared[name]) for name in names]
+
+    @classmethod
+    def field_names(cls):
+        return list(cls.serializer_class.Meta.fields)
+
+    @staticmethod
+    def _converter(field):
+        # Column types whose DRF representation is a plain cast.
+        if isinstance(field, (serializers.ChoiceField, serializers.CharField)):
+            return str
+        if isinstance(field, serializers.BooleanField):
+            return bool
+        if isinstance(field, serializers.IntegerField):
+            return int
+        if isinstance(field, serializers.FloatField):
+            return float
+        if isinstance(field, serializers.DateTimeField) and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601:
+            tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+            def convert(value):
+                if tz is not None:
+                    value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert
+        return field.to_representation
+
+    def render(self, rows):
+        """
+        Render tuples whose leading columns are ``self.sources``; any trailing
+        columns (e.g. ones fetched for cursors) are ignored.
+        """
+        names, converters = self.names, self.converters
+        return [
+            {name: None if value is None else convert(value) for name, convert, value in zip(names, converters, row)}
+            for row in rows
+        ]
+
+    def serialize(self, queryset):
+        return self.render(queryset.values_list(*self.sources))
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import alerts, cache, conditional, counters, rollups, search
+from .models import Budget, Expense, SavingsGoal, UserSettings
+
+# bulk_create, bulk_update and QuerySet.update do not send model signals, and
+# QuerySet.delete sends one per row. Bulk code paths run inside muted() and
+# report the whole batch through expenses_changed() instead.
+_muted = ContextVar('expense_signals_muted', default=False)
+
+
+@contextmanager
+def muted():
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def expenses_changed(added=(), removed=()):
+    """
+    Propagate a batch of Expense writes to every derived store. An update is
+    the old row in ``removed`` plus the new row in ``added``.
+    """
+    added, removed = list(added), list(removed)
+    deltas = rollups.expense_deltas(added)
+    rollups.expense_deltas(removed, sign=-1, deltas=deltas)
+    rollups.apply_deltas(deltas)
+    spend = counters.expense_deltas(added)
+    counters.expense_deltas(removed, sign=-1, deltas=spend)
+    counters.apply_deltas(spend)
+    alerts.check(alerts.raised_spend(spend))
+    search.index(added, removed)
+    user_data_touched({expense.user_id for expense in chain(added, removed)} - {None})
+
+
+def user_data_touched(user_ids):
+    """Invalidate cached responses and HTTP validators for ``user_ids``."""
+    user_ids = set(user_ids)
+    conditional.bump(user_ids)
+
+    # Only after commit: a read between the bump and the commit would cache
+    # the old data under the new version.
+    def bump_cache():
+        for user_id in user_ids:
+            cache.bump_version(user_id)
+    transaction.on_commit(bump_cache)
+
+
+@receiver(pre_save, sender=Expense)
+def remember_previous_expense(sender, instance, raw=False, **kwargs):
+    instance._previous = None
+    if instance.pk and not raw and not _muted.get():
+        instance._previous = Expense.objects.filter(pk=instance.pk).only(
+            'user', 'date', 'category', 'currency', 'amount'
+        ).first()
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, raw=False, **kwargs):
+    if raw or _muted.get():
+        return
+    previous = getattr(instance, '_previous', None)
+    expenses_changed(added=[instance], removed=[previous] if previous is not None else [])
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    expenses_changed(removed=[instance])
+
+
+@receiver(post_save, sender=Budget)
+def budget_saved(sender, instance, raw=False, **kwargs):
+    # A new or lowered limit can already be reached. Registered before
+    # user_data_changed so the alert exists before validators move on.
+    if raw or _muted.get() or instance.user_id is None:
+        return
+    alerts.check({instance.user_id: {instance.category_id}})
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+@receiver(post_save, sender=UserSettings)
+def user_data_changed(sender, instance, raw=False, **kwargs):
+    if raw or _muted.get():
+        return
+    if instance.user_id is not None:
+        user_data_touched([instance.user_id])
@@ -0,0 +1,989 @@
+"""
+Tests for the expenses app.
+
+The query budget tests cover every view in expenses/urls.py. Each view is
+requested against growing data sets and must run exactly the number of
+queries declared in QUERY_BUDGETS, whatever the number of rows. A view
+that starts querying per row (an N+1) or per category fails here instead
+of in production. When a change legitimately adds or removes a query,
+update its budget in QUERY_BUDGETS.
+
+Counts cover the whole request (session, auth, conditional-GET validators,
+cache misses) plus streamed response bodies, and include queries run on
+worker threads by async views. Responses are always measured on a cold
+response cache.
+
+The remaining test cases check behaviour that query counts cannot see:
+cache invalidation, derived stores staying in step with expenses, and
+analytics results.
+"""
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import TestCase, TransactionTestCase
+from django.test.client import MULTIPART_CONTENT
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import (
+    alerts, anomalies, cache, categories, counters, forecast, imports, middleware, pagination, recurring, rollups, search,
+    signals, urls,
+)
+from .models import (
+    Budget, BudgetAlert, Category, DailySpend, ExchangeRate, Expense, PeriodSpend, SavingsGoal, SpendForecast,
+    UserDataVersion, UserSettings,
+)
+from .serializers import ExpenseSerializer, FastExpenseSerializer
+
+# (url name, method) -> queries per request
+QUERY_BUDGETS = {
+    ('home', 'GET'): 2,
+    ('signup', 'GET'): 0,
+    ('login', 'GET'): 0,
+    ('logout', 'GET'): 4,
+    ('expense-list', 'GET'): 4,
+    ('expense-list', 'GET paginated'): 4,
+    ('expense-list', 'POST'): 21,
+    ('expense-search', 'GET'): 5,
+    ('expense-export', 'GET'): 3,
+    ('expense-import', 'POST'): 20,
+    ('expense-bulk', 'POST'): 26,
+    ('expense-anomalies', 'GET'): 4,
+    ('expense-detail', 'GET'): 3,
+    ('expense-detail', 'PUT'): 24,
+    ('expense-detail', 'DELETE'): 18,
+    ('analytics', 'GET'): 7,
+    ('analytics-async', 'GET'): 7,
+    ('analytics-timeseries', 'GET'): 6,
+    ('analytics-timeseries', 'GET tz'): 6,
+    ('budget-list', 'GET'): 4,
+    ('budget-list', 'POST'): 9,
+    ('budget-detail', 'GET'): 3,
+    ('budget-detail', 'PUT'): 9,
+    ('budget-detail', 'DELETE'): 6,
+    ('budget-status', 'GET'): 6,
+    ('budget-alerts', 'GET'): 4,
+    ('cache-stats', 'GET'): 2,
+    ('performance-stats', 'GET'): 2,
+    ('forecast', 'GET'): 10,
+    ('forecast', 'GET refit'): 18,
+    ('goal-list', 'GET'): 4,
+    ('goal-list', 'POST'): 5,
+    ('goal-detail', 'GET'): 3,
+    ('goal-detail', 'PUT'): 5,
+    ('goal-detail', 'DELETE'): 5,
+    ('user-settings', 'GET'): 3,
+    ('user-settings', 'PUT'): 5,
+}
+
+# Data sets grow between measurements: expenses per user at each step
+SIZES = (5, 50, 250)
+
+# Payload fields matching fixture_expenses(); new expenses are dated now
+FIXTURE = {'category': 'Fixture', 'currency': 'INR'}
+
+CATEGORY_NAMES = ['Food', 'Transport', 'Coffee', 'Groceries', 'Rent', 'Travel', 'Health', 'Gifts']
+
+_counter = ContextVar('expenses_test_query_counter', default=None)
+_counter_lock = threading.Lock()
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is not None:
+        with _counter_lock:
+            counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install, dispatch_uid='expenses.tests.count_queries')
+
+
+@contextmanager
+def count_queries():
+    """
+    Count queries on every connection, including those opened by worker
+    threads (the context variable follows the request into sync_to_async).
+    """
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+    counter = [0]
+    token = _counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _counter.reset(token)
+
+
+class QueryBudgetMixin:
+    """Seeding and measuring helpers shared by the sync and async test cases."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user('budget', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.client.force_login(self.user)
+        self.seeded = 0
+
+    def grow(self, size):
+        """Bring the user's data up to ``size`` expenses, with categories, budgets and goals to match."""
+        now = timezone.now()
+        names = CATEGORY_NAMES[:max(1, min(len(CATEGORY_NAMES), size // 10))]
+        by_key = categories.resolve(self.user, names)
+        batch = [
+            Expense(
+                user=self.user,
+                category=by_key[categories.normalize(names[n % len(names)])],
+                amount=10 + n,
+                currency='USD' if n % 4 == 0 else 'INR',
+                date=now - timedelta(days=n % 90, hours=n % 24),
+                notes=f"coffee and snacks {n}" if n % 3 == 0 else None,
+            )
+            for n in range(self.seeded, size)
+        ]
+        with signals.muted():
+            Expense.objects.bulk_create(batch)
+        signals.expenses_changed(added=batch)
+        self.seeded = size
+
+        existing = set(Budget.objects.filter(user=self.user).values_list('category_id', flat=True))
+        Budget.objects.bulk_create(
+            Budget(user=self.user, category=category, limit=1000, period='monthly')
+            for category in by_key.values() if category.id not in existing
+        )
+        SavingsGoal.objects.bulk_create(
+            SavingsGoal(user=self.user, name=f"Goal {n}", target_amount=1000 * (n + 1),
+                        deadline=now.date() + timedelta(days=30 * (n + 1)))
+            for n in range(SavingsGoal.objects.filter(user=self.user).count(), size // 25 + 1)
+        )
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(date=now.date() - timedelta(days=days), currency=currency, rate=rate)
+            for days in range(0, 90, 7) for currency, rate in (('INR', 83.0), ('USD', 1.0))
+        ], ignore_conflicts=True)
+        signals.user_data_touched({self.user.id})
+
+    def measure(self, method, name, args=(), data=None, query=None, **extra):
+        """Run one request on a cold response cache; returns (response, query count)."""
+        cache.get_cache().clear()
+        url = reverse(f'expenses:{name}', args=args)
+        if query:
+            url = f"{url}?{query}"
+        call = getattr(self.client, method.lower())
+        kwargs = {'data': data, **extra}
+        if data is not None and method in ('POST', 'PUT'):
+            kwargs.setdefault('content_type', 'application/json')
+        with count_queries() as counter:
+            response = call(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, counter[0]
+
+    def assertQueryBudget(self, name, method, status, budget_key=None, request=None, **kwargs):
+        """
+        Request ``name`` at every data size and hold it to its declared budget.
+        ``request(test)`` is called before each measurement and may return
+        extra ``measure`` arguments, e.g. ids created for that round.
+        """
+        budget = QUERY_BUDGETS[(name, budget_key or method)]
+        counts = {}
+        for size in SIZES:
+            self.grow(size)
+            arguments = {**kwargs, **((request(self) if request else None) or {})}
+            response, counts[size] = self.measure(method, name, **arguments)
+            self.assertEqual(response.status_code, status, getattr(response, 'content', b'')[:500])
+        self.assertEqual(
+            counts, {size: budget for size in SIZES},
+            f"{method} {name}: query count per data size differs from its budget of {budget}",
+        )
+
+    def fixture_expenses(self, count=2):
+        """
+        Fresh expenses in one fixed (day, category, currency) bucket. Writes
+        against them only ever update that rollup row, never create or empty
+        it, so their cost does not depend on what earlier rounds left behind.
+        """
+        category = categories.resolve(self.user, [FIXTURE['category']])[categories.normalize(FIXTURE['category'])]
+        return [
+            Expense.objects.create(user=self.user, category=category, amount=20, currency=FIXTURE['currency'])
+            for _ in range(count)
+        ]
+
+    def expense_id(self):
+        return Expense.objects.filter(user=self.user).latest('date').id
+
+    def budget_id(self):
+        return Budget.objects.filter(user=self.user).earliest('id').id
+
+    def goal_id(self):
+        return SavingsGoal.objects.filter(user=self.user).earliest('id').id
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def test_every_view_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if isinstance(pattern, URLPattern)}
+        budgeted = {name for name, _ in QUERY_BUDGETS}
+        self.assertEqual(names - budgeted, set(), "Add the new view(s) to QUERY_BUDGETS")
+        self.assertEqual(budgeted - names, set(), "QUERY_BUDGETS names views that no longer exist")
+
+    # ----------------- Pages -----------------
+    def test_home(self):
+        self.assertQueryBudget('home', 'GET', 200)
+
+    def test_signup_page(self):
+        self.client.logout()
+        self.assertQueryBudget('signup', 'GET', 200)
+
+    def test_login_page(self):
+        self.client.logout()
+        self.assertQueryBudget('login', 'GET', 200)
+
+    def test_logout(self):
+        self.assertQueryBudget('logout', 'GET', 302, request=lambda test: test.client.force_login(test.user))
+
+    # ----------------- Expenses -----------------
+    def test_expense_list(self):
+        self.assertQueryBudget('expense-list', 'GET', 200)
+
+    def test_expense_list_paginated(self):
+        self.assertQueryBudget('expense-list', 'GET', 200, budget_key='GET paginated', query='limit=20')
+
+    def test_expense_create(self):
+        self.fixture_expenses()
+        self.assertQueryBudget('expense-list', 'POST', 201, data={**FIXTURE, 'amount': 12.5})
+
+    def test_expense_search(self):
+        self.assertQueryBudget('expense-search', 'GET', 200, query='q=coffee')
+
+    def test_expense_export(self):
+        self.assertQueryBudget('expense-export', 'GET', 200, query='output=csv')
+
+    def test_expense_import(self):
+        self.fixture_expenses()
+        csv = b"category,amount,currency,notes\nFixture,12.5,INR,lunch\nFixture,3,INR,\n"
+        self.assertQueryBudget('expense-import', 'POST', 201, content_type=MULTIPART_CONTENT, request=lambda test: {
+            'data': {'file': SimpleUploadedFile('expenses.csv', csv, content_type='text/csv')},
+        })
+
+    def test_expense_bulk(self):
+        def request(test):
+            first, second = test.fixture_expenses()
+            return {'data': [
+                {'op': 'create', 'data': {**FIXTURE, 'amount': 5}},
+                {'op': 'update', 'id': first.id, 'data': {**FIXTURE, 'amount': 7}},
+                {'op': 'delete', 'id': second.id},
+            ]}
+        self.assertQueryBudget('expense-bulk', 'POST', 200, request=request)
+
+    @skipUnless(anomalies.available(), "NumPy is not installed")
+    def test_expense_anomalies(self):
+        def request(test):
+            anomalies.scan_users([test.user.id])
+        self.assertQueryBudget('expense-anomalies', 'GET', 200, request=request)
+
+    def test_expense_detail(self):
+        self.assertQueryBudget('expense-detail', 'GET', 200, request=lambda test: {'args': [test.expense_id()]})
+
+    def test_expense_update(self):
+        self.assertQueryBudget('expense-detail', 'PUT', 200, data={**FIXTURE, 'amount': 99}, request=lambda test: {
+            'args': [test.fixture_expenses()[0].id],
+        })
+
+    def test_expense_delete(self):
+        self.assertQueryBudget('expense-detail', 'DELETE', 204, request=lambda test: {
+            'args': [test.fixture_expenses()[0].id],
+        })
+
+    # ----------------- Analytics -----------------
+    def test_analytics(self):
+        self.assertQueryBudget('analytics', 'GET', 200)
+
+    def test_analytics_timeseries(self):
+        self.assertQueryBudget('analytics-timeseries', 'GET', 200, query='granularity=week')
+
+    def test_analytics_timeseries_in_time_zone(self):
+        self.assertQueryBudget('analytics-timeseries', 'GET', 200, budget_key='GET tz',
+                               query='granularity=month&tz=America/New_York')
+
+    # ----------------- Budgets -----------------
+    def test_budget_list(self):
+        self.assertQueryBudget('budget-list', 'GET', 200)
+
+    def test_budget_create(self):
+        # Each size adds categories, so there is always one without a budget yet
+        self.assertQueryBudget('budget-list', 'POST', 201, request=lambda test: {'data': {
+            'category': f"New {test.seeded}", 'limit': 500, 'period': 'monthly', 'currency': 'INR',
+        }})
+
+    def test_budget_detail(self):
+        self.assertQueryBudget('budget-detail', 'GET', 200, request=lambda test: {'args': [test.budget_id()]})
+
+    def test_budget_update(self):
+        self.assertQueryBudget('budget-detail', 'PUT', 200, request=lambda test: {'args': [test.budget_id()]},
+                               data={'category': 'Food', 'limit': 750, 'period': 'monthly', 'currency': 'INR'})
+
+    def test_budget_delete(self):
+        self.assertQueryBudget('budget-detail', 'DELETE', 204, request=lambda test: {'args': [test.budget_id()]})
+
+    def test_budget_status(self):
+        self.assertQueryBudget('budget-status', 'GET', 200)
+
+    def test_budget_alerts(self):
+        self.assertQueryBudget('budget-alerts', 'GET', 200)
+
+    # ----------------- Admin -----------------
+    def test_cache_stats(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertQueryBudget('cache-stats', 'GET', 200)
+
+    def test_performance_stats(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertQueryBudget('performance-stats', 'GET', 200)
+
+    # ----------------- Forecast -----------------
+    @skipUnless(forecast.available(), "NumPy is not installed")
+    def test_forecast(self):
+        # Today's fit is stored, as after the nightly precompute_forecasts run
+        def request(test):
+            forecast.fit(test.user)
+        self.assertQueryBudget('forecast', 'GET', 200, request=request)
+
+    @skipUnless(forecast.available(), "NumPy is not installed")
+    def test_forecast_refit(self):
+        def request(test):
+            SpendForecast.objects.filter(user=test.user).delete()
+        self.assertQueryBudget('forecast', 'GET', 200, budget_key='GET refit', request=request)
+
+    # ----------------- Savings Goals -----------------
+    def test_goal_list(self):
+        self.assertQueryBudget('goal-list', 'GET', 200)
+
+    def test_goal_create(self):
+        self.assertQueryBudget('goal-list', 'POST', 201, data={
+            'name': 'Bike', 'target_amount': 800, 'deadline': '2030-01-01', 'currency': 'INR',
+        })
+
+    def test_goal_detail(self):
+        self.assertQueryBudget('goal-detail', 'GET', 200, request=lambda test: {'args': [test.goal_id()]})
+
+    def test_goal_update(self):
+        self.assertQueryBudget('goal-detail', 'PUT', 200, request=lambda test: {'args': [test.goal_id()]}, data={
+            'name': 'Bike', 'target_amount': 900, 'current_amount': 100, 'deadline': '2030-01-01', 'currency': 'INR',
+        })
+
+    def test_goal_delete(self):
+        self.assertQueryBudget('goal-detail', 'DELETE', 204, request=lambda test: {'args': [test.goal_id()]})
+
+    # ----------------- User Settings -----------------
+    def test_user_settings(self):
+        self.assertQueryBudget('user-settings', 'GET', 200)
+
+    def test_user_settings_update(self):
+        self.assertQueryBudget('user-settings', 'PUT', 200, data={'currency': 'USD', 'theme': 'light'})
+
+
+class AsyncQueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    """
+    The async view runs its queries on worker threads with their own
+    connections, which cannot see a TestCase transaction, so the data is
+    committed here.
+    """
+
+    def test_analytics_async(self):
+        self.assertQueryBudget('analytics-async', 'GET', 200)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user('cached', password='pw')
+        self.client.force_login(self.user)
+
+    def test_version_moves_only_after_commit(self):
+        before = cache.get_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            signals.user_data_touched({self.user.id})
+            # A read before the commit still sees the old data: keep its key
+            self.assertEqual(cache.get_version(self.user.id), before)
+        self.assertNotEqual(cache.get_version(self.user.id), before)
+
+    def test_date_dependent_responses_miss_on_a_new_day(self):
+        url = reverse('expenses:budget-status')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        next_month = timezone.localdate() + timedelta(days=32)
+        with mock.patch('django.utils.timezone.localdate', return_value=next_month):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+
+class UserDeletionTests(TransactionTestCase):
+    """Deleting a user commits, so foreign keys are checked for real."""
+
+    def test_delete_user_with_data(self):
+        user = User.objects.create_user('leaving', password='pw')
+        UserSettings.objects.create(user=user, currency='INR')
+        category = categories.resolve(user, ['Food'])[categories.normalize('Food')]
+        Expense.objects.create(user=user, category=category, amount=12)
+        Budget.objects.create(user=user, category=category, limit=100)
+        SavingsGoal.objects.create(user=user, name='Bike', target_amount=500, deadline=timezone.localdate())
+        self.assertTrue(UserDataVersion.objects.filter(user=user).exists())
+
+        user.delete()
+        self.assertFalse(User.objects.filter(username='leaving').exists())
+        self.assertFalse(UserDataVersion.objects.filter(user_id=user.id).exists())
+
+    def test_delete_user_cascades_through_categories(self):
+        user = User.objects.create_user('categorised', password='pw')
+        by_key = categories.resolve(user, ['Food', 'Travel', 'Rent'])
+        for n, category in enumerate(by_key.values()):
+            Expense.objects.create(user=user, category=category, amount=10 + n, currency='USD' if n else 'INR')
+            Budget.objects.create(user=user, category=category, limit=5)
+        Expense.objects.create(
+            user=user, category=by_key[categories.normalize('Rent')], amount=900,
+            is_recurring=True, recurring_frequency='monthly', next_occurrence=timezone.now(),
+        )
+        self.assertTrue(DailySpend.objects.filter(user=user).exists())
+        self.assertTrue(PeriodSpend.objects.filter(user=user).exists())
+
+        user.delete()
+        for model in (Category, Expense, Budget, DailySpend, PeriodSpend):
+            self.assertFalse(model.objects.filter(user_id=user.id).exists(), model.__name__)
+
+    def test_delete_user_with_only_a_goal(self):
+        user = User.objects.create_user('saver', password='pw')
+        SavingsGoal.objects.create(user=user, name='Bike', target_amount=500, deadline=timezone.localdate())
+
+        user.delete()
+        self.assertFalse(User.objects.filter(username='saver').exists())
+        self.assertFalse(UserDataVersion.objects.exists())
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('searcher', password='pw')
+        self.client.force_login(self.user)
+
+    def test_stale_index_rows_never_show_other_users_expenses(self):
+        other = User.objects.create_user('other', password='pw')
+        category = categories.resolve(other, ['Coffee'])[categories.normalize('Coffee')]
+        with signals.muted():
+            theirs = Expense.objects.create(user=other, category=category, amount=4, notes='espresso')
+        # An index row that wrongly names this user as the owner
+        search.index(added=[Expense(id=theirs.id, user=self.user, category=category, notes='espresso')])
+
+        response = self.client.get(reverse('expenses:expense-search'), {'q': 'espresso'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def search(self, text):
+        response = self.client.get(reverse('expenses:expense-search'), {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.json()['results'])
+
+    def test_materialized_occurrences_are_found_under_their_own_ids(self):
+        category = categories.resolve(self.user, ['Rent'])[categories.normalize('Rent')]
+        template = Expense.objects.create(
+            user=self.user, category=category, amount=900, notes='flat', is_recurring=True,
+            recurring_frequency='daily', date=timezone.now() - timedelta(days=3),
+        )
+        # A deleted row leaves a gap between the expense ids and max(rowid) + 1
+        Expense.objects.create(user=self.user, category=category, amount=1, notes='flat').delete()
+
+        recurring.materialize()
+        expected = sorted([template.id, *template.occurrences.values_list('id', flat=True)])
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(self.search('flat'), expected)
+
+        Expense.objects.filter(id=expected[-1]).first().delete()
+        self.assertEqual(self.search('flat'), expected[:-1])
+
+    def test_rows_without_an_id_are_not_indexed(self):
+        category = categories.resolve(self.user, ['Rent'])[categories.normalize('Rent')]
+        search.index(added=[Expense(user=self.user, category=category, notes='unsaved')])
+        self.assertEqual(search.search_ids(self.user, 'unsaved', 10), [])
+
+
+class AnalyticsTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user('analyst', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.client.force_login(self.user)
+        self.category = categories.resolve(self.user, ['Food'])[categories.normalize('Food')]
+
+    def spend(self, amount, *when):
+        Expense.objects.create(
+            user=self.user, category=self.category, amount=amount, date=datetime(*when, tzinfo=dt_timezone.utc),
+        )
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(f'expenses:{name}'), params)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response.json()
+
+    def buckets(self, **params):
+        return {
+            bucket['start']: (bucket['total'], bucket['count'])
+            for bucket in self.get('analytics-timeseries', **params)['buckets']
+        }
+
+    def test_week_three_of_different_years_stays_apart(self):
+        self.spend(30, 2025, 1, 15, 12)  # 2025-W03
+        self.spend(70, 2026, 1, 14, 12)  # 2026-W03
+
+        weekly = self.get('analytics')['weekly_breakdown']
+        self.assertEqual(weekly, {'2025-W03': 30, '2026-W03': 70})
+
+        buckets = self.buckets(granularity='week')
+        self.assertEqual(buckets['2025-01-13'], (30, 1))
+        self.assertEqual(buckets['2026-01-12'], (70, 1))
+        self.assertEqual(sum(count for _, count in buckets.values()), 2)
+
+    def test_gaps_are_zero_filled(self):
+        self.spend(10, 2026, 1, 1, 12)
+        self.spend(20, 2026, 1, 4, 12)
+
+        self.assertEqual(self.buckets(granularity='day'), {
+            '2026-01-01': (10, 1), '2026-01-02': (0, 0), '2026-01-03': (0, 0), '2026-01-04': (20, 1),
+        })
+        # An explicit range is filled even where it has no spending at all
+        self.assertEqual(self.buckets(granularity='month', start_date='2025-11-01', end_date='2026-02-28'), {
+            '2025-11-01': (0, 0), '2025-12-01': (0, 0), '2026-01-01': (30, 2), '2026-02-01': (0, 0),
+        })
+
+    def test_time_zone_moves_expense_across_day_and_month(self):
+        # 23:30 UTC on 31 March is already 1 April in Kolkata (UTC+5:30)
+        self.spend(40, 2026, 3, 31, 23, 30)
+
+        self.assertEqual(self.buckets(granularity='month'), {'2026-03-01': (40, 1)})
+        self.assertEqual(self.buckets(granularity='month', tz='Asia/Kolkata'), {'2026-04-01': (40, 1)})
+        self.assertEqual(self.buckets(granularity='day', tz='Asia/Kolkata'), {'2026-04-01': (40, 1)})
+        # and still 31 March in New York
+        self.assertEqual(self.buckets(granularity='day', tz='America/New_York'), {'2026-03-31': (40, 1)})
+
+
+class SpendCounterTests(TestCase):
+    """PeriodSpend must follow every edit and delete, whichever window it moves spend between."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('counted', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.client.force_login(self.user)
+        self.by_key = categories.resolve(self.user, ['Food', 'Travel'])
+
+    def spend(self, name, amount, *when, currency='INR'):
+        return Expense.objects.create(
+            user=self.user, category=self.by_key[categories.normalize(name)], amount=amount, currency=currency,
+            date=datetime(*when, tzinfo=dt_timezone.utc),
+        )
+
+    def test_edits_and_deletes_keep_counters_exact(self):
+        end_of_january = self.spend('Food', 10, 2026, 1, 31, 23)
+        first_of_february = self.spend('Food', 20, 2026, 2, 1, 1)
+        new_years_eve = self.spend('Travel', 30, 2025, 12, 31, 22)
+        bulk_edited = self.spend('Travel', 40, 2026, 2, 14, 12)
+        bulk_deleted = self.spend('Food', 50, 2026, 3, 1, 0)
+        deleted = self.spend('Travel', 60, 2026, 1, 1, 0)
+        self.assertEqual(counters.diff([self.user]), [])
+
+        # Category, amount and currency through the API
+        response = self.client.put(
+            reverse('expenses:expense-detail', args=[end_of_january.id]),
+            {'amount': 15, 'category': 'Travel', 'currency': 'USD'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        # The API keeps dates read-only; moves between months and years go through save()
+        first_of_february.date = datetime(2026, 1, 31, 12, tzinfo=dt_timezone.utc)
+        first_of_february.save()
+        new_years_eve.date = datetime(2026, 1, 1, 0, 30, tzinfo=dt_timezone.utc)
+        new_years_eve.category = self.by_key[categories.normalize('Food')]
+        new_years_eve.save()
+        self.assertEqual(counters.diff([self.user]), [])
+
+        response = self.client.post(reverse('expenses:expense-bulk'), [
+            {'op': 'update', 'id': bulk_edited.id, 'data': {'amount': 45, 'category': 'Food', 'currency': 'INR'}},
+            {'op': 'delete', 'id': bulk_deleted.id},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.delete(reverse('expenses:expense-detail', args=[deleted.id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(counters.diff([self.user]), [])
+
+        # Emptied windows are removed rather than left at zero
+        self.assertFalse(PeriodSpend.objects.filter(user=self.user, start='2026-03-01').exists())
+        self.assertFalse(PeriodSpend.objects.filter(user=self.user, start='2025-01-01').exists())
+
+
+class ExpenseListPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('pager', password='pw')
+        self.client.force_login(self.user)
+        category = categories.resolve(self.user, ['Food'])[categories.normalize('Food')]
+        # Three expenses share each date, so pages must break ties on id
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, category=category, amount=n, date=datetime(2026, 1, 1 + n // 3, tzinfo=dt_timezone.utc),
+            )
+            for n in range(8)
+        ]
+        self.newest_first = [
+            expense.id for expense in sorted(self.expenses, key=lambda e: (e.date, e.id), reverse=True)
+        ]
+
+    def page(self, **params):
+        response = self.client.get(reverse('expenses:expense-list'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return [row['id'] for row in body['results']], body['next'], body['previous']
+
+    def test_next_and_previous_walk_every_row_once(self):
+        pages = []
+        ids, next_cursor, previous_cursor = self.page(limit=3)
+        self.assertIsNone(previous_cursor)
+        pages.append(ids)
+        while next_cursor:
+            ids, next_cursor, previous_cursor = self.page(limit=3, cursor=next_cursor)
+            pages.append(ids)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), self.newest_first)
+
+        # And back again from the last page
+        back = [pages[-1]]
+        while previous_cursor:
+            ids, _, previous_cursor = self.page(limit=3, cursor=previous_cursor)
+            back.insert(0, ids)
+        self.assertEqual(back, pages)
+
+    def test_bad_cursor_or_limit_is_rejected(self):
+        url = reverse('expenses:expense-list')
+        for params, field in [
+            ({'cursor': 'not-a-cursor'}, 'cursor'),
+            ({'cursor': pagination.encode_cursor('x', (timezone.now(), 1))}, 'cursor'),
+            ({'limit': 'ten'}, 'limit'),
+            ({'limit': '0'}, 'limit'),
+        ]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.json())
+
+
+class BulkTests(TestCase):
+    """The bulk endpoint is all-or-nothing and keeps the derived stores exact."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('bulky', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.client.force_login(self.user)
+        self.by_key = categories.resolve(self.user, ['Food', 'Travel'])
+        food = self.by_key[categories.normalize('Food')]
+        self.kept = Expense.objects.create(user=self.user, category=food, amount=10)
+        self.edited = Expense.objects.create(user=self.user, category=food, amount=20)
+        self.removed = Expense.objects.create(
+            user=self.user, category=food, amount=30, currency='USD', date=timezone.now() - timedelta(days=40),
+        )
+
+    def bulk(self, operations):
+        return self.client.post(reverse('expenses:expense-bulk'), operations, content_type='application/json')
+
+    def expense_rows(self):
+        return sorted(Expense.objects.filter(user=self.user).values_list('id', 'amount', 'currency', 'category_id'))
+
+    def daily_spend(self):
+        return sorted(
+            DailySpend.objects.filter(user=self.user).values_list('day', 'category_id', 'currency', 'total', 'count')
+        )
+
+    def test_one_invalid_item_writes_nothing(self):
+        expenses = self.expense_rows()
+        rollup, spend = self.daily_spend(), counters.stored([self.user])
+
+        response = self.bulk([
+            {'op': 'create', 'data': {'amount': 5, 'category': 'Books', 'currency': 'INR'}},
+            {'op': 'update', 'id': self.edited.id, 'data': {'amount': 25, 'category': 'Travel', 'currency': 'INR'}},
+            {'op': 'delete', 'id': self.removed.id},
+            {'op': 'create', 'data': {'amount': 'lots', 'category': 'Food', 'currency': 'INR'}},
+            {'op': 'delete', 'id': self.kept.id + 1000},
+        ])
+        self.assertEqual(response.status_code, 400)
+        results = response.json()
+        self.assertEqual([result['status'] for result in results], [424, 424, 424, 400, 404])
+        self.assertIn('amount', results[3]['errors'])
+
+        self.assertEqual(self.expense_rows(), expenses)
+        self.assertFalse(Category.objects.filter(user=self.user, key='books').exists())
+        self.assertEqual(self.daily_spend(), rollup)
+        self.assertEqual(counters.stored([self.user]), spend)
+
+    def test_mixed_batch_keeps_rollups_and_counters_exact(self):
+        response = self.bulk([
+            {'op': 'create', 'data': {'amount': 5, 'category': 'Books', 'currency': 'EUR'}},
+            {'op': 'update', 'id': self.edited.id, 'data': {'amount': 25, 'category': 'Travel', 'currency': 'INR'}},
+            {'op': 'delete', 'id': self.removed.id},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([result['status'] for result in response.json()], [201, 200, 204])
+        self.assertFalse(Expense.objects.filter(id=self.removed.id).exists())
+
+        self.assertEqual(counters.diff([self.user]), [])
+        rollup = self.daily_spend()
+        rollups.rebuild([self.user])
+        self.assertEqual(self.daily_spend(), rollup)
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('importer', password='pw')
+        self.client.force_login(self.user)
+
+    def upload(self, text, **data):
+        upload = SimpleUploadedFile('expenses.csv', text.encode(), content_type='text/csv')
+        return self.client.post(reverse('expenses:expense-import'), {'file': upload, **data})
+
+    def test_invalid_rows_are_reported_by_line(self):
+        response = self.upload(
+            "date,amount,category,currency\n"
+            "2026-01-02,12.5,Food,INR\n"
+            "2026-01-03,twelve,Food,INR\n"
+            "2026-01-04,7,,XYZ\n"
+            "2026-01-05,3,Travel,usd\n"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        report = response.json()
+        self.assertEqual((report['valid'], report['imported'], report['error_count']), (2, 2, 2))
+        self.assertEqual([(error['line'], sorted(error['errors'])) for error in report['errors']], [
+            (3, ['amount']), (4, ['category', 'currency']),
+        ])
+        imported = Expense.objects.filter(user=self.user).values_list('amount', 'currency')
+        self.assertEqual(sorted(imported), [(3, 'USD'), (12.5, 'INR')])
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload("amount,category\n10,Food\n20,Books\n", dry_run='true')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['valid'], response.json()['imported']), (2, 0))
+        for model in (Expense, Category, DailySpend, PeriodSpend):
+            self.assertFalse(model.objects.filter(user=self.user).exists(), model.__name__)
+
+    def test_malformed_file_is_rejected_as_a_whole(self):
+        text = "amount,category,notes\n10,Food,fine\n" + f'20,Food,"{"x" * 200_000}"\n'
+        response = self.upload(text)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 3', response.json()['file'][0])
+
+        # Batches written before the bad line roll back with the import
+        with self.assertRaises(imports.InvalidImportFile):
+            imports.import_csv(self.user, io.StringIO(text), batch_size=1)
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        with self.assertRaisesMessage(CommandError, 'Malformed CSV'):
+            call_command('import_expenses', f.name, user=self.user.username, stdout=io.StringIO())
+
+
+class RecurringTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('repeater', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.category = categories.resolve(self.user, ['Rent'])[categories.normalize('Rent')]
+        self.now = timezone.now()
+        self.template = Expense.objects.create(
+            user=self.user, category=self.category, amount=100, notes='flat', is_recurring=True,
+            recurring_frequency='daily', date=self.now - timedelta(days=5),
+        )
+
+    def test_rerunning_a_window_creates_nothing(self):
+        # An earlier, interrupted run already wrote the first occurrence
+        Expense.objects.create(
+            user=self.user, category=self.category, amount=100, date=self.template.date + timedelta(days=1),
+            recurring_source=self.template,
+        )
+        self.assertEqual(recurring.materialize(self.now), (1, 4))
+        # Forget the marker so the next run walks the same window again
+        Expense.objects.filter(id=self.template.id).update(next_occurrence=None)
+        self.assertEqual(recurring.materialize(self.now), (1, 0))
+
+        self.assertEqual(self.template.occurrences.count(), 5)
+        self.assertEqual(counters.diff([self.user]), [])
+        out = io.StringIO()
+        call_command('reconcile_spend_counters', '--check', stdout=out)
+        self.assertIn('match', out.getvalue())
+
+    def test_seeded_templates_materialize(self):
+        call_command('seed_data', users=2, expenses=300, budgets=0, goals=0, stdout=io.StringIO())
+        templates = Expense.objects.filter(user__username__startswith='loadtest_', is_recurring=True)
+        self.assertTrue(templates.exists())
+        self.assertFalse(templates.filter(recurring_frequency__isnull=True).exists())
+        self.assertFalse(templates.filter(next_occurrence__isnull=True).exists())
+
+        _, created = recurring.materialize(self.now)
+        self.assertEqual(created, Expense.objects.filter(recurring_source__isnull=False).count())
+        self.assertFalse(templates.filter(next_occurrence__lte=self.now).exists())
+
+
+class FastExpenseSerializerTests(TestCase):
+    """The values_list fast path must render exactly what ExpenseSerializer does."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('serialized', password='pw')
+        by_key = categories.resolve(self.user, ['Food', 'Rent'])
+        food, rent = by_key[categories.normalize('Food')], by_key[categories.normalize('Rent')]
+        template = Expense.objects.create(
+            user=self.user, category=rent, amount=1200, notes='flat', currency='EUR', is_recurring=True,
+            recurring_frequency='monthly', date=datetime(2026, 1, 31, 9, 30, tzinfo=dt_timezone.utc),
+            next_occurrence=datetime(2026, 2, 28, 9, 30, tzinfo=dt_timezone.utc),
+        )
+        Expense.objects.create(
+            user=self.user, category=rent, amount=1200, currency='EUR', recurring_source=template,
+            date=datetime(2026, 2, 28, 9, 30, tzinfo=dt_timezone.utc),
+        )
+        Expense.objects.create(user=self.user, category=food, amount=12.345, notes=None, currency='USD')
+        Expense.objects.create(user=self.user, category=food, amount=0.1, notes='', currency='GBP')
+        Expense.objects.create(
+            user=self.user, category=food, amount=7, notes='naïve café ☕',
+            date=datetime(2025, 12, 31, 23, 59, 59, 999999, tzinfo=dt_timezone.utc),
+        )
+
+    def test_output_is_byte_identical(self):
+        renderer = JSONRenderer()
+        expenses = Expense.objects.filter(user=self.user).order_by('-date', '-id')
+        slow = renderer.render(ExpenseSerializer(expenses.select_related('category'), many=True).data)
+        self.assertEqual(renderer.render(FastExpenseSerializer().serialize(expenses)), slow)
+
+        fields = ['id', 'notes', 'recurring_frequency', 'currency']
+        sparse = [{name: row[name] for name in fields} for row in ExpenseSerializer(expenses, many=True).data]
+        self.assertEqual(renderer.render(FastExpenseSerializer(fields).serialize(expenses)), renderer.render(sparse))
+
+
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        middleware.reset()
+        self.addCleanup(middleware.reset)
+        self.user = User.objects.create_user('timed', password='pw')
+        self.client.force_login(self.user)
+        category = categories.resolve(self.user, ['Food'])[categories.normalize('Food')]
+        Expense.objects.create(user=self.user, category=category, amount=3)
+
+    def test_streamed_body_is_recorded_once_sent(self):
+        response = self.client.get(reverse('expenses:expense-export'))
+        self.assertTrue(response.streaming)
+        header_queries = int(response['Server-Timing'].split('desc="')[1].split()[0])
+        self.assertEqual(middleware.stats(), [])
+
+        b''.join(response.streaming_content)
+        response.close()
+        [row] = middleware.stats()
+        self.assertEqual((row['endpoint'], row['count']), ('GET /api/expenses/export/', 1))
+        # The export query runs while the body is generated
+        self.assertEqual(row['avg_queries'], header_queries + 1)
+
+
+class BudgetAlertTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alerted', password='pw')
+        UserSettings.objects.create(user=self.user, currency='INR')
+        self.client.force_login(self.user)
+        self.category = categories.resolve(self.user, ['Food'])[categories.normalize('Food')]
+        self.budget = Budget.objects.create(user=self.user, category=self.category, limit=100, period='monthly')
+
+    def spend(self, amount, date=None):
+        Expense.objects.create(user=self.user, category=self.category, amount=amount, date=date or timezone.now())
+
+    def thresholds(self):
+        return list(BudgetAlert.objects.filter(user=self.user).order_by('period_start', 'threshold')
+                    .values_list('period_start', 'threshold'))
+
+    def test_each_threshold_alerts_once_per_window(self):
+        start = counters.window_start('monthly', timezone.localdate())
+        self.spend(50)
+        self.assertEqual(self.thresholds(), [])
+        self.spend(35)
+        self.spend(5)
+        self.assertEqual(self.thresholds(), [(start, 80)])
+        self.spend(20)
+        self.spend(10)
+        # Lowering the limit re-checks the budget, but both thresholds are taken
+        self.budget.limit = 50
+        self.budget.save()
+        self.assertEqual(self.thresholds(), [(start, 80), (start, 100)])
+
+        # The previous month is a window of its own
+        earlier = timezone.make_aware(datetime(start.year, start.month, 1, 12)) - timedelta(days=3)
+        self.spend(60, date=earlier)
+        for _ in range(2):
+            alerts.check({self.user.id: {self.category.id}}, now=earlier)
+        previous = counters.window_start('monthly', timezone.localdate(earlier))
+        self.assertEqual(self.thresholds(), [(previous, 80), (previous, 100), (start, 80), (start, 100)])
+
+        # A writer that missed the existing alert cannot record it twice
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BudgetAlert.objects.create(user=self.user, budget=self.budget, period_start=start, threshold=80,
+                                       spent=120, limit=100)
+
+    def test_since_returns_only_newer_alerts(self):
+        self.spend(120)
+        first, second = BudgetAlert.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)
+        url = reverse('expenses:budget-alerts')
+
+        data = self.client.get(url).json()
+        self.assertEqual([alert['id'] for alert in data['results']], [first, second])
+        data = self.client.get(url, {'since': first}).json()
+        self.assertEqual(([alert['id'] for alert in data['results']], data['since']), ([second], second))
+        data = self.client.get(url, {'since': second}).json()
+        self.assertEqual((data['results'], data['since']), ([], second))
+
+        for since in ('-1', 'abc', '1.5'):
+            response = self.client.get(url, {'since': since})
+            self.assertEqual(response.status_code, 400, since)
+            self.assertIn('since', response.json())
+
+
+class BatchCommandTests(TestCase):
+
+    def setUp(self):
+        for username in ('nightly', 'early'):
+            user = User.objects.create_user(username, password='pw')
+            category = categories.resolve(user, ['Food'])[categories.normalize('Food')]
+            Expense.objects.bulk_create(
+                Expense(user=user, category=category, amount=10 + n, date=timezone.now() - timedelta(days=n))
+                for n in range(30)
+            )
+
+    @skipUnless(anomalies.available(), "NumPy is not installed")
+    def test_sqlite_runs_in_process_whatever_the_worker_count(self):
+        out = io.StringIO()
+        call_command('detect_anomalies', workers=4, chunk_size=1, stdout=out)
+        self.assertIn('Scanned 2 user(s) with 1 worker(s)', out.getvalue())
+        call_command('precompute_forecasts', workers=4, chunk_size=1, user=['nightly', 'early'], stdout=out)
+        self.assertIn('Fitted forecasts for 2 user(s) with 1 worker(s)', out.getvalue())
+
+    @skipUnless(anomalies.available(), "NumPy is not installed")
+    def test_unknown_users_are_named(self):
+        for command in ('detect_anomalies', 'precompute_forecasts'):
+            with self.assertRaisesMessage(CommandError, 'Unknown user(s): ghost'):
+                call_command(command, user=['nightly', 'ghost'])
@@ -1,8 +1,11 @@
 from django.urls import path
 from .views import (
     home, signup_view, login_view, logout_view,
-    expense_list, expense_detail, analytics, 
-    budget_list, budget_detail, budget_status,
+    expense_list, expense_search, expense_export, expense_import, expense_bulk, expense_anomalies,
+    expense_detail,
+    analytics, analytics_async, analytics_timeseries,
+    budget_list, budget_detail, budget_status, budget_alerts, cache_stats, performance_stats,
+    spending_forecast,
     goal_list, goal_detail, user_settings
 )
 
@@ -17,16 +20,33 @@ urlpatterns = [
 
     # ---------------- Expenses API ----------------
     path('api/expenses/', expense_list, name='expense-list'),
+    path('api/expenses/search/', expense_search, name='expense-search'),
+    path('api/expenses/export/', expense_export, name='expense-export'),
+    path('api/expenses/import/', expense_import, name='expense-import'),
+    path('api/expenses/bulk/', expense_bulk, name='expense-bulk'),
+    path('api/expenses/anomalies/', expense_anomalies, name='expense-anomalies'),
     path('api/expenses/<int:id>/', expense_detail, name='expense-detail'),
     
     # ---------------- Analytics API ----------------
     path('api/analytics/', analytics, name='analytics'),
+    path('api/analytics/async/', analytics_async, name='analytics-async'),
+    path('api/analytics/timeseries/', analytics_timeseries, name='analytics-timeseries'),
     
     # ---------------- Budgets API ----------------
     path('api/budgets/', budget_list, name='budget-list'),
     path('api/budgets/<int:id>/', budget_detail, name='budget-detail'),
     path('api/budget-status/', budget_status, name='budget-status'),
+    path('api/budget-alerts/', budget_alerts, name='budget-alerts'),
+
+    # ---------------- Cache API ----------------
+    path('api/cache-stats/', cache_stats, name='cache-stats'),
+
+    # ---------------- Performance API ----------------
+    path('api/performance/', performance_stats, name='performance-stats'),
     
+    # ---------------- Forecast API ----------------
+    path('api/forecast/', spending_forecast, name='forecast'),
+
     # ---------------- Goals API ----------------
     path('api/goals/', goal_list, name='goal-list'),
     path('api/goals/<int:id>/', goal_detail, name='goal-detail'),
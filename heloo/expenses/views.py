@@ -1,13 +1,26 @@
 # views.py
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import Expense, Budget, SavingsGoal, UserSettings
-from .serializers import ExpenseSerializer, BudgetSerializer, SavingsGoalSerializer, UserSettingsSerializer
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import Expense, ExpenseAnomaly, Budget, BudgetAlert, SavingsGoal, UserSettings
+from .serializers import ExpenseSerializer, ExpenseAnomalySerializer, BudgetSerializer, BudgetAlertSerializer, SavingsGoalSerializer, UserSettingsSerializer, FastExpenseSerializer
+from .analytics import asummarize, parse_include, summarize, timeseries
+from .budgets import budget_status_for
+from .cache import cached_response
+from .conditional import conditional
+from .routers import replica_reads
+from . import cache, export, forecast, middleware, search
+from .imports import InvalidImportFile, import_csv
+from .bulk import MAX_OPERATIONS, apply_operations
+from .pagination import InvalidCursor, paginate_expenses, parse_limit, parse_since
 from django.shortcuts import get_object_or_404, render, redirect
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+import io
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Sum, Count
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
@@ -16,6 +29,17 @@ from django.contrib.auth.decorators import login_required
 
 
 
+def parse_day(value):
+    """Accept a date or datetime query param and return its (local) date."""
+    parsed = parse_datetime(value)
+    if parsed is not None:
+        return timezone.localdate(parsed) if timezone.is_aware(parsed) else parsed.date()
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"'{value}' is not a valid date.")
+    return parsed
+
+
 # ----------------- Frontend Home -----------------
 @login_required(login_url= 'expenses:login')
 def home(request):
@@ -56,25 +80,57 @@ def logout_view(request):
 
 
 # ----------------- Expenses -----------------
+def filter_expenses(request, expenses):
+    """Apply the category / start_date / end_date query params shared by expense listings."""
+    category = request.query_params.get('category')
+    if category:
+        expenses = expenses.filter(category__name__icontains=category)
+
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+    if start_date:
+        expenses = expenses.filter(date__gte=start_date)
+    if end_date:
+        expenses = expenses.filter(date__lte=end_date)
+    return expenses
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('expenses')
 def expense_list(request):
     if request.method == 'GET':
-        expenses = Expense.objects.filter(user=request.user).order_by('-date')
-
-        category = request.query_params.get('category')
-        if category:
-            expenses = expenses.filter(category__icontains=category)
-
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if start_date:
-            expenses = expenses.filter(date__gte=start_date)
-        if end_date:
-            expenses = expenses.filter(date__lte=end_date)
-
-        serializer = ExpenseSerializer(expenses, many=True)
-        return Response(serializer.data)
+        expenses = filter_expenses(request, Expense.objects.filter(user=request.user)).order_by('-date')
+
+        fields = request.query_params.get('fields')
+        if fields:
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+            unknown = set(fields) - set(FastExpenseSerializer.field_names())
+            if unknown:
+                return Response({'fields': [f"Unknown field(s): {', '.join(sorted(unknown))}."]}, status=400)
+        serializer = FastExpenseSerializer(fields or None)
+
+        # Keyset pagination is opt-in so clients that expect the full list keep working
+        limit = request.query_params.get('limit')
+        cursor = request.query_params.get('cursor')
+        if limit is not None or cursor is not None:
+            try:
+                limit = parse_limit(limit)
+            except ValueError as e:
+                return Response({'limit': [str(e)]}, status=400)
+            try:
+                rows, next_cursor, previous_cursor = paginate_expenses(
+                    expenses, limit, cursor or None, columns=serializer.sources
+                )
+            except InvalidCursor as e:
+                return Response({'cursor': [str(e)]}, status=400)
+            return Response({
+                'next': next_cursor,
+                'previous': previous_cursor,
+                'results': serializer.render(rows),
+            })
+
+        return Response(serializer.serialize(expenses))
 
     if request.method == 'POST':
         serializer = ExpenseSerializer(data=request.data)
@@ -84,10 +140,107 @@ def expense_list(request):
         return Response(serializer.errors, status=400)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('expense-search')
+def expense_search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': ['This field is required.']}, status=400)
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+    except ValueError as e:
+        return Response({'limit': [str(e)]}, status=400)
+
+    ids = search.search_ids(request.user, query, limit)
+    serializer = FastExpenseSerializer()
+    # Fetch the matches in one query, then restore the ranking order
+    rows = {
+        row[-1]: row
+        for row in Expense.objects.filter(user=request.user, id__in=ids).values_list(*serializer.sources, 'id')
+    }
+    return Response({'results': serializer.render(rows[pk] for pk in ids if pk in rows)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def expense_export(request):
+    # 'format' is reserved by DRF for renderer selection, hence 'output'
+    output = request.query_params.get('output', 'csv')
+    if output not in export.STREAMS:
+        return Response({'output': [f"Must be one of: {', '.join(export.STREAMS)}."]}, status=400)
+
+    # Streamed after the view returns, so pin the read database chosen for it
+    expenses = Expense.objects.using(request.read_db).filter(user=request.user)
+    expenses = filter_expenses(request, expenses).order_by('-date', '-id')
+    response = StreamingHttpResponse(export.STREAMS[output](expenses), content_type=export.CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="expenses.{output}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def expense_import(request):
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'file': ['No file was submitted.']}, status=400)
+    dry_run = str(request.data.get('dry_run', request.query_params.get('dry_run', ''))).lower() in ('1', 'true', 'yes')
+
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_csv(request.user, lines, dry_run=dry_run)
+    except InvalidImportFile as e:
+        return Response({'file': [str(e)]}, status=400)
+    except UnicodeDecodeError:
+        return Response({'file': ['File must be UTF-8 encoded CSV.']}, status=400)
+    return Response(report, status=200 if dry_run or not report['imported'] else 201)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def expense_bulk(request):
+    operations = request.data
+    if not isinstance(operations, list):
+        return Response({'non_field_errors': ['Expected a list of operations.']}, status=400)
+    if len(operations) > MAX_OPERATIONS:
+        return Response({'non_field_errors': [f'At most {MAX_OPERATIONS} operations per request.']}, status=400)
+
+    ok, results = apply_operations(request.user, operations)
+    return Response(results, status=200 if ok else 400)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('expense-anomalies')
+def expense_anomalies(request):
+    """
+    Expenses flagged by the detect_anomalies job, as a ``since=`` feed like
+    ``budget_alerts``.
+    """
+    try:
+        since = parse_since(request.query_params.get('since'))
+    except ValueError as e:
+        return Response({'since': [str(e)]}, status=400)
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+    except ValueError as e:
+        return Response({'limit': [str(e)]}, status=400)
+
+    anomalies = list(
+        ExpenseAnomaly.objects.filter(user=request.user, id__gt=since)
+        .select_related('expense__category').order_by('id')[:limit]
+    )
+    return Response({
+        'results': ExpenseAnomalySerializer(anomalies, many=True).data,
+        'since': anomalies[-1].id if anomalies else since,
+    })
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def expense_detail(request, id):
-    expense = get_object_or_404(Expense, id=id, user=request.user)
+    expense = get_object_or_404(Expense.objects.select_related('category'), id=id, user=request.user)
 
     if request.method == 'GET':
         serializer = ExpenseSerializer(expense)
@@ -108,48 +261,78 @@ def expense_detail(request, id):
 # ----------------- Analytics -----------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('analytics')
+@cached_response('analytics')
+@replica_reads
 def analytics(request):
-    expenses = Expense.objects.filter(user=request.user)
+    params, errors = analytics_params(request.query_params)
+    if errors:
+        return Response(errors, status=400)
+    return Response(summarize(request.user, **params))
+
+
+def analytics_params(query_params):
+    """Parse start_date / end_date / include into ``(summarize kwargs, errors)``."""
+    try:
+        start_date = parse_day(query_params['start_date']) if query_params.get('start_date') else None
+        end_date = parse_day(query_params['end_date']) if query_params.get('end_date') else None
+    except ValueError as e:
+        return None, {'date': [str(e)]}
+    try:
+        include = parse_include(query_params.get('include'))
+    except ValueError as e:
+        return None, {'include': [str(e)]}
+    return {'start': start_date, 'end': end_date, 'include': include}, None
+
+
+@require_GET
+@replica_reads
+async def analytics_async(request):
+    """
+    Async analytics for ASGI deployments (heloo.asgi): same parameters and
+    payload as ``analytics``, with the independent queries run concurrently.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    params, errors = analytics_params(request.GET)
+    if errors:
+        return JsonResponse(errors, status=400)
+    return JsonResponse(await asummarize(user, **params))
 
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-    if start_date:
-        expenses = expenses.filter(date__gte=start_date)
-    if end_date:
-        expenses = expenses.filter(date__lte=end_date)
 
-    total = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    count = expenses.count()
-    average = (total / count) if count > 0 else 0
-
-    category_breakdown = expenses.values('category').annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')
-
-    daily = expenses.extra(select={'date': 'DATE(date)'}).values('date').annotate(total=Sum('amount')).order_by('date')
-
-    weekly = {}
-    for exp in expenses:
-        week = exp.date.isocalendar()[1]
-        weekly[week] = weekly.get(week, 0) + exp.amount
-
-    return Response({
-        'total': total,
-        'count': count,
-        'average': round(average, 2),
-        'category_breakdown': list(category_breakdown),
-        'daily_trend': list(daily),
-        'weekly_breakdown': weekly
-    })
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('analytics-timeseries')
+@cached_response('analytics-timeseries')
+@replica_reads
+def analytics_timeseries(request):
+    params, errors = analytics_params(request.query_params)
+    if errors:
+        return Response(errors, status=400)
+    tz = request.query_params.get('tz')
+    if tz:
+        try:
+            tz = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'tz': [f"Unknown time zone '{tz}'."]}, status=400)
+    try:
+        data = timeseries(
+            request.user, request.query_params.get('granularity', 'day'), tz or None,
+            params['start'], params['end'],
+        )
+    except ValueError as e:
+        return Response({'granularity': [str(e)]}, status=400)
+    return Response(data)
 
 
 # ----------------- Budget -----------------
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('budgets')
 def budget_list(request):
     if request.method == 'GET':
-        budgets = Budget.objects.filter(user=request.user)
+        budgets = Budget.objects.filter(user=request.user).select_related('category')
         serializer = BudgetSerializer(budgets, many=True)
         return Response(serializer.data)
 
@@ -164,7 +347,7 @@ def budget_list(request):
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def budget_detail(request, id):
-    budget = get_object_or_404(Budget, id=id, user=request.user)
+    budget = get_object_or_404(Budget.objects.select_related('category'), id=id, user=request.user)
 
     if request.method == 'GET':
         serializer = BudgetSerializer(budget)
@@ -184,32 +367,71 @@ def budget_detail(request, id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('budget-status', vary_on_date=True)
+@cached_response('budget-status', vary_on_date=True)
+@replica_reads
 def budget_status(request):
-    budgets = Budget.objects.filter(user=request.user)
-    budget_status_data = []
+    return Response(budget_status_for(request.user))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('budget-alerts')
+def budget_alerts(request):
+    """
+    Budget alerts newer than ``since`` (the last id seen), oldest first; the
+    response's ``since`` is the value for the next call. An unchanged feed is
+    answered 304 from the data version alone.
+    """
+    try:
+        since = parse_since(request.query_params.get('since'))
+    except ValueError as e:
+        return Response({'since': [str(e)]}, status=400)
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+    except ValueError as e:
+        return Response({'limit': [str(e)]}, status=400)
+
+    alerts = list(
+        BudgetAlert.objects.filter(user=request.user, id__gt=since)
+        .select_related('budget__category').order_by('id')[:limit]
+    )
+    return Response({
+        'results': BudgetAlertSerializer(alerts, many=True).data,
+        'since': alerts[-1].id if alerts else since,
+    })
 
-    for budget in budgets:
-        expenses = Expense.objects.filter(user=request.user, category=budget.category)
-        spent = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-        remaining = budget.limit - spent
-        percentage = (spent / budget.limit * 100) if budget.limit > 0 else 0
 
-        budget_status_data.append({
-            'id': budget.id,
-            'category': budget.category,
-            'limit': budget.limit,
-            'spent': spent,
-            'remaining': remaining,
-            'percentage': round(percentage, 2),
-            'is_exceeded': spent > budget.limit
-        })
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(cache.stats(['analytics', 'analytics-timeseries', 'budget-status', 'forecast']))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def performance_stats(request):
+    if request.query_params.get('reset'):
+        middleware.reset()
+    return Response(middleware.stats())
 
-    return Response(budget_status_data)
+
+# ----------------- Forecast -----------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('forecast', vary_on_date=True)
+@cached_response('forecast', vary_on_date=True)
+def spending_forecast(request):
+    """Projected month-end spend, budget overrun dates and savings-goal completion dates."""
+    if not forecast.available():
+        return Response({'detail': 'Forecasting requires NumPy, which is not installed.'}, status=503)
+    return Response(forecast.project(request.user))
 
 
 # ----------------- Savings Goals -----------------
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('goals')
 def goal_list(request):
     if request.method == 'GET':
         goals = SavingsGoal.objects.filter(user=request.user)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expenses.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,9 +80,58 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open across requests, checked before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # WAL lets readers run while a write is in progress; writers wait
+            # up to 20s for the lock instead of failing with "database is locked",
+            # and IMMEDIATE takes it at BEGIN so a transaction never has to upgrade.
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Optional read replica for analytics, budget status and export reads
+# (expenses.routers), e.g. a SQLite copy kept current by Litestream or a
+# Postgres standby. Set HELOO_REPLICA_DB to its SQLite path to enable it.
+if os.environ.get('HELOO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['HELOO_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['expenses.routers.ReadReplicaRouter']
+
+EXPENSES_REPLICA_ALIAS = 'replica'
+# Users who wrote within this many seconds keep reading from the primary
+EXPENSES_REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# LocMem is per process; with several workers switch 'default' to a shared
+# backend such as django.core.cache.backends.redis.RedisCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'expenses',
     }
 }
 
+# Cache alias and timeout (seconds) for cached analytics / budget-status responses
+EXPENSES_CACHE_ALIAS = 'default'
+EXPENSES_CACHE_TIMEOUT = 300
+
+# Requests slower than this (ms) are logged with their slowest SQL, and the
+# last EXPENSES_PERF_WINDOW requests per endpoint feed /api/performance/
+EXPENSES_SLOW_REQUEST_MS = 500
+EXPENSES_PERF_WINDOW = 1000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
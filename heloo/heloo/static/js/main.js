@@ -343,6 +343,8 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     loadDashboard();
+    pollBudgetAlerts();
+    setInterval(pollBudgetAlerts, ALERT_POLL_MS);
 });
 
 // ===== ANALYTICS =====
@@ -402,11 +404,12 @@ async function loadAnalytics() {
         if (charts.weekly) charts.weekly.destroy();
         const ctx3 = document.getElementById('weeklyChart');
         if (ctx3) {
-            const weeks = Object.keys(data.weekly_breakdown).sort((a, b) => a - b);
+            // Keys are ISO weeks like "2026-W03", so they sort as strings
+            const weeks = Object.keys(data.weekly_breakdown).sort();
             charts.weekly = new Chart(ctx3, {
                 type: 'bar',
                 data: {
-                    labels: weeks.map(w => `Week ${w}`),
+                    labels: weeks,
                     datasets: [{
                         label: 'Weekly Spending',
                         data: weeks.map(w => data.weekly_breakdown[w]),
@@ -494,6 +497,35 @@ async function deleteBudget(id) {
     }
 }
 
+// Budget alerts: poll the incremental feed; unchanged polls are answered 304 from the ETag
+const ALERT_POLL_MS = 30000;
+let alertsSince = null;
+
+async function fetchBudgetAlerts(since) {
+    const response = await fetch(`${API_BASE_URL}/budget-alerts/?since=${since}`);
+    return response.ok ? response.json() : null;
+}
+
+async function pollBudgetAlerts() {
+    try {
+        if (alertsSince === null) {
+            // Skip alerts raised before the page was opened
+            let data = { since: 0, results: [null] };
+            while (data && data.results.length) data = await fetchBudgetAlerts(data.since);
+            if (data) alertsSince = data.since;
+            return;
+        }
+        const data = await fetchBudgetAlerts(alertsSince);
+        if (!data || !data.results.length) return;
+        alertsSince = data.since;
+        data.results.forEach(a => alert(`${a.category} budget reached ${a.threshold}% (₹${a.spent.toFixed(2)} of ₹${a.limit.toFixed(2)})`));
+        if (currentPage === 'budgets') loadBudgets();
+        if (currentPage === 'dashboard') loadDashboard();
+    } catch (error) {
+        console.error('Error polling budget alerts:', error);
+    }
+}
+
 // ===== GOALS =====
 async function loadGoals() {
     try {
@@ -1,16 +1,122 @@
 import json
+import os
+import tempfile
+
+# expenses.json is a snapshot; every add and delete since it was written is
+# appended to expenses.log as one JSON line, so a change costs one small
+# fsynced append instead of rewriting every expense. Once the log holds as
+# many operations as the snapshot holds expenses, it is folded into a new
+# snapshot.
+SNAPSHOT = "expenses.json"
+LOG = "expenses.log"
+COMPACT_MIN_OPS = 1000
+
 expenses = []
+generation = 0
+snapshot_size = 0
+log_ops = 0
+
+
+def fsync_dir(path):
+    # Make a rename durable; not possible (nor needed) on Windows
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_atomic(path, text):
+    """Replace ``path`` with ``text`` via a synced temp file, so it is never half written."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".expenses-")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    fsync_dir(path)
+
+
 def load_expenses():
-    global expenses
+    """Load the snapshot, then replay the log operations written after it."""
+    global expenses, generation, snapshot_size, log_ops
     try:
-        with open("expenses.json", "r") as file:
-            expenses = json.load(file)
+        with open(SNAPSHOT, "r") as file:
+            snapshot = json.load(file)
     except FileNotFoundError:
-        expenses = []
+        snapshot = []
+    # A plain list is a snapshot from before the log existed
+    if isinstance(snapshot, list):
+        snapshot = {"generation": 0, "expenses": snapshot}
+    expenses = snapshot["expenses"]
+    generation = snapshot["generation"]
+    snapshot_size = len(expenses)
+    log_ops = 0
+
+    try:
+        with open(LOG, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        data = b""
+    lines = data.split(b"\n")
+    # The last line is incomplete if a crash interrupted an append; drop it
+    complete = len(data) - len(lines[-1])
+    header = json.loads(lines[0]) if len(lines) > 1 else None
+    if header is None or header["generation"] != generation:
+        # No log yet, or a compaction stopped after writing the snapshot
+        # that already contains it: start an empty log for this snapshot.
+        reset_log()
+        return
+    for line in lines[1:-1]:
+        apply(json.loads(line))
+        log_ops += 1
+    if complete < len(data):
+        with open(LOG, "r+b") as file:
+            file.truncate(complete)
+            os.fsync(file.fileno())
+
+
+def apply(op):
+    if op["op"] == "add":
+        expenses.append(op["expense"])
+    elif op["op"] == "delete":
+        expenses.pop(op["index"])
+
+
+def reset_log():
+    write_atomic(LOG, json.dumps({"generation": generation}) + "\n")
+
+
+def record(op):
+    """Append ``op`` durably to the log, then apply it."""
+    global log_ops
+    with open(LOG, "a") as file:
+        file.write(json.dumps(op) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+    apply(op)
+    log_ops += 1
+    # Rewriting the snapshot only after as many operations as it holds
+    # keeps its cost at O(1) amortized per operation.
+    if log_ops >= max(COMPACT_MIN_OPS, snapshot_size):
+        compact()
+
+
+def compact():
+    """Write the current expenses as a new snapshot, then start a new log for it."""
+    global generation, snapshot_size, log_ops
+    generation += 1
+    write_atomic(SNAPSHOT, json.dumps({"generation": generation, "expenses": expenses}))
+    reset_log()
+    snapshot_size = len(expenses)
+    log_ops = 0
+
 
-def save_expenses():
-    with open("expenses.json", "w") as file:
-        json.dump(expenses, file)
 def add_expense():
     while True:
         try:
@@ -29,8 +135,7 @@ def add_expense():
         "amount": amount,
         "category": category
     }
-    expenses.append(expense)
-    save_expenses()  
+    record({"op": "add", "expense": expense})
     print("Expense added successfully!")
 
 
@@ -46,8 +151,8 @@ def delete_expense():
     try:
         idx = int(input("Enter expense number to delete: ")) - 1
         if 0 <= idx < len(expenses) :
-            removed = expenses.pop(idx)
-            save_expenses()
+            removed = expenses[idx]
+            record({"op": "delete", "index": idx})
             print(f"Deleted {removed['category']} - ₹{removed['amount']}")
         else:
             print("Invalid number.")